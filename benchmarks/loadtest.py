@@ -0,0 +1,106 @@
+"""Load test for the local render server
+
+Fires concurrent requests at a render server and reports latency
+percentiles and requests per second. By default a server is started in
+this process on a free localhost port:
+
+    ```
+    python benchmarks/loadtest.py --requests 500 --concurrency 16
+    ```
+
+Use `--url` to target a server started with `rapid-plotly serve`.
+`--unique` sets how many distinct specs are sent, so it controls the
+cache hit rate.
+
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.request
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from rapid_plotly import server
+
+
+def make_spec(i, rows, fmt):
+    """Creates the `i`th distinct lineplot spec"""
+    rs = np.random.RandomState(i)
+    values = rs.randn(rows, 2).cumsum(axis=0).round(3)
+
+    return {
+        'type': 'lineplot',
+        'data': {'index': list(range(rows)), 'columns': ['a', 'b'],
+                 'data': values.tolist()},
+        'args': {'title': 'spec %d' % i},
+        'format': fmt,
+    }
+
+
+def post(url, body):
+    """Sends one request, returns `(seconds, status, cache header)`"""
+    req = urllib.request.Request(url, data=body,
+                                 headers={'Content-Type': 'application/json'})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req) as resp:
+            resp.read()
+            status, cache = resp.status, resp.headers.get('X-Cache')
+    except urllib.error.HTTPError as e:
+        status, cache = e.code, None
+
+    return time.perf_counter() - start, status, cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--url', default=None,
+                        help='server to target, e.g. http://127.0.0.1:8050')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--unique', type=int, default=20,
+                        help='number of distinct specs sent')
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--format', default='json')
+    args = parser.parse_args()
+
+    url = args.url
+    engine = False
+    if url is None:
+        engine = server.start_engine()
+        server.warm_up()
+        httpd = server.make_server(port=0, quiet=True)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        url = 'http://%s:%d' % httpd.server_address[:2]
+
+    bodies = [json.dumps(make_spec(i, args.rows, args.format)).encode()
+              for i in range(args.unique)]
+    order = [bodies[i % args.unique] for i in range(args.requests)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        results = list(pool.map(lambda b: post(url + '/render', b), order))
+    total = time.perf_counter() - start
+
+    if engine:
+        server.stop_engine()
+
+    latency = np.array([r[0] for r in results]) * 1000
+    errors = sum(1 for r in results if r[1] != 200)
+    hits = sum(1 for r in results if r[2] == 'hit')
+
+    print('%d requests, concurrency %d, %d distinct specs'
+          % (args.requests, args.concurrency, args.unique))
+    print('p50 %.1f ms, p99 %.1f ms, max %.1f ms'
+          % (np.percentile(latency, 50), np.percentile(latency, 99),
+             latency.max()))
+    print('%.1f requests/s, %d cache hits, %d errors'
+          % (args.requests / total, hits, errors))
+
+
+if __name__ == '__main__':
+    main()
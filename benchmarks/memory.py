@@ -0,0 +1,101 @@
+"""Checks the peak memory of `create_graph` calls against ceilings
+
+Each graph is created with a `memory_budget` on a wide DataFrame, and
+the tracemalloc peak recorded in `helpers.memory_reports` is compared
+with a ceiling, a multiple of the budget plus a small allowance. Plotly
+validates and then copies every trace array, so peaks are about twice
+the payload. Each function is called once on a small frame first, so
+one-off allocations aren't counted. `tests/test_memory.py` runs the
+same checks on a smaller frame, with the `slack` and `warm_up` of this
+module. Exits with status 1 if any ceiling is exceeded:
+
+    ```
+    python benchmarks/memory.py
+    ```
+
+"""
+import argparse
+import os
+import sys
+import warnings
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from rapid_plotly import barplot, helpers, lineplot, scatterplot
+
+
+# allowance in bytes for allocations that don't scale with the data
+slack = 2 ** 20
+
+
+def warm_up(in_data):
+    """Calls each function once on a few rows of `in_data`
+
+    The first calls allocate validators and import modules, which would
+    otherwise be counted in the peak of the first case.
+
+    """
+    small = in_data.iloc[:100, :3]
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', ResourceWarning)
+        lineplot.create_graph(small, figonly=True, memory_budget=1)
+        barplot.create_graph(small, figonly=True, memory_budget=1)
+        scatterplot.create_graph(small[['c0']], small[['c1']],
+                                 figonly=True, memory_budget=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--cols', type=int, default=20)
+    args = parser.parse_args()
+
+    in_data = pd.DataFrame(np.random.rand(args.rows, args.cols),
+                           columns=['c%d' % i for i in range(args.cols)])
+    bars = in_data.iloc[:20000]
+    payload = helpers.estimate_payload(in_data)
+
+    # (name, function, budget, ceiling as a multiple of the budget)
+    cases = [
+        ('lineplot', lambda b: lineplot.create_graph(
+            in_data, figonly=True, memory_budget=b), payload, 2.5),
+        ('lineplot alt', lambda b: lineplot.create_graph(
+            in_data, alt_trace_cols=['c0', 'c1'], figonly=True,
+            memory_budget=b), payload, 2.5),
+        ('lineplot over budget', lambda b: lineplot.create_graph(
+            in_data, figonly=True, memory_budget=b), payload // 10, 4.0),
+        ('barplot', lambda b: barplot.create_graph(
+            bars, figonly=True, memory_budget=b),
+         helpers.estimate_payload(bars), 2.5),
+        ('scatterplot', lambda b: scatterplot.create_graph(
+            in_data[['c0', 'c1']], in_data[['c2']], figonly=True,
+            memory_budget=b),
+         helpers.estimate_payload(in_data[['c0', 'c1']]) * 2, 2.5),
+    ]
+
+    warm_up(in_data)
+
+    print('input data: %.1f MB' % (in_data.memory_usage().sum() / 1e6))
+    print('%-22s %10s %10s %10s'
+          % ('case', 'budget MB', 'peak MB', 'ceiling MB'))
+
+    failed = 0
+    for name, func, budget, multiple in cases:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', ResourceWarning)
+            func(budget)
+
+        peak = helpers.memory_reports[-1]['peak']
+        ceiling = budget * multiple + slack
+        status = 'ok' if peak <= ceiling else 'FAILED'
+        failed += peak > ceiling
+
+        print('%-22s %10.1f %10.1f %10.1f %s'
+              % (name, budget / 1e6, peak / 1e6, ceiling / 1e6, status))
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
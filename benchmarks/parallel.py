@@ -0,0 +1,98 @@
+"""Scaling of parallel trace construction over worker counts
+
+Times `lineplot.create_graph` on a wide DataFrame with traces built
+across pools of 1, 2, 4, ... workers, up to the number of cores. The
+speedup is relative to a single worker, which builds traces the same
+way, so it only measures parallelism. The serial build, which doesn't
+use a pool, is timed for reference. Run from the root of the repo:
+
+    ```
+    python benchmarks/parallel.py --columns 2000 --rows 1000
+    ```
+
+Each parallel figure is checked against the serial one, so that the
+speedup doesn't come at the cost of trace order.
+
+"""
+import argparse
+import os
+import sys
+import time
+from copy import deepcopy
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from rapid_plotly import helpers, lineplot
+
+
+def best_time(func, repeat):
+    """Returns the fastest of `repeat` runs of `func`, and its output"""
+    times = list()
+    for i in range(repeat):
+        start = time.perf_counter()
+        out = func()
+        times.append(time.perf_counter() - start)
+
+    return min(times), out
+
+
+def trace_names(fig):
+    """Returns the names of the traces of `fig`, in order"""
+    return [trace.name for trace in fig.data]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--columns', type=int, default=2000)
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--executor', default='process',
+                        choices=['process', 'thread'])
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count())
+    parser.add_argument('--repeat', type=int, default=2)
+    args = parser.parse_args()
+
+    in_data = pd.DataFrame(
+        np.random.randn(args.rows, args.columns).cumsum(axis=0),
+        columns=['col%d' % i for i in range(args.columns)],
+    )
+
+    def run(workers):
+        return lineplot.create_graph(in_data, figonly=True,
+                                     layout=deepcopy(helpers.layout),
+                                     workers=workers,
+                                     executor=args.executor)
+
+    counts = [None]
+    n = 1
+    while n <= args.max_workers:
+        counts.append(n)
+        n *= 2
+    if counts[-1] != args.max_workers:
+        counts.append(args.max_workers)
+
+    print('%d columns x %d rows, %s pool, %d cores, best of %d'
+          % (args.columns, args.rows, args.executor, os.cpu_count(),
+             args.repeat))
+    print('%-8s %10s %10s' % ('workers', 'seconds', 'speedup'))
+
+    base = None
+    for workers in counts:
+        seconds, fig = best_time(lambda: run(workers), args.repeat)
+        if workers is None:
+            names = trace_names(fig)
+            print('%-8s %10.3f %10s' % ('serial', seconds, '-'))
+            continue
+
+        if trace_names(fig) != names:
+            raise AssertionError('trace order differs with %d workers'
+                                 % workers)
+
+        if base is None:
+            base = seconds
+
+        print('%-8s %10.3f %9.2fx' % (workers, seconds, base / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Compares JSON serialization backends on a 1M-point lineplot
+
+Run from the root of the repo:
+
+    ```
+    python benchmarks/serialize.py
+    ```
+
+Plotly's default encoder is timed through `plotly.io.to_json`, the
+other backends through `serialize.figure_json`. The 'orjson' backend is
+skipped if orjson is not installed.
+
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from rapid_plotly import lineplot, serialize
+
+
+def best_time(func, repeat):
+    """Returns the fastest of `repeat` runs of `func`, and its output"""
+    times = list()
+    for i in range(repeat):
+        start = time.perf_counter()
+        out = func()
+        times.append(time.perf_counter() - start)
+
+    return min(times), out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--points', type=int, default=1000000,
+                        help='total number of points in the figure')
+    parser.add_argument('--traces', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rows = args.points // args.traces
+    in_data = pd.DataFrame(
+        np.random.randn(rows, args.traces).cumsum(axis=0),
+        columns=['trace%d' % i for i in range(args.traces)],
+    )
+    fig = lineplot.create_graph(in_data, figonly=True)
+
+    cases = [('plotly', None, lambda: pio.to_json(fig, engine='json'))]
+    for backend in ['json', 'orjson']:
+        if backend == 'orjson' and serialize.orjson is None:
+            continue
+        for precision in [None, 3]:
+            cases.append((backend, precision,
+                          lambda b=backend, p=precision:
+                          ''.join(serialize.figure_json(fig, b, p))))
+
+    print('%d points in %d traces, best of %d'
+          % (rows * args.traces, args.traces, args.repeat))
+    print('%-8s %-10s %10s %12s' % ('backend', 'precision', 'seconds', 'MB'))
+
+    for backend, precision, func in cases:
+        seconds, out = best_time(func, args.repeat)
+        print('%-8s %-10s %10.3f %12.1f'
+              % (backend, precision, seconds, len(out) / 1e6))
+
+
+if __name__ == '__main__':
+    main()
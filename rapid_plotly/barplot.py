@@ -32,31 +32,71 @@ def create_errors(error, error_barwidth):
 
 
 def create_trace(in_data, colors, col, hoverinfo, names, errors,
-                 error_barwidth):
-    """Creates a barplot trace for a column in `in_data`"""
+                 error_barwidth, x=None, as_dict=False):
+    """Creates a barplot trace for a column in `in_data`
+
+    `x` defaults to a list of the index of `in_data`. If `as_dict` is
+    True, the trace is returned as a dict holding `in_data[col]` as is,
+    see `helpers.budget_factor`.
+
+    """
     if isinstance(errors, str):
         error_y = {}
     else:
         error_y = create_errors(errors[col], error_barwidth)
 
-    trace = go.Bar(
-        x=list(in_data.index),
+    if x is None:
+        x = list(in_data.index)
+
+    trace = dict(
+        x=x,
         y=in_data[col],
         name=col,
         text=names[col],
-        marker=go.bar.Marker(color=colors[col]),
+        marker=dict(color=colors[col]),
         hoverinfo=hoverinfo,
         error_y=error_y
     )
 
-    return trace
+    if as_dict:
+        return dict(trace, type='bar')
+
+    return go.Bar(**trace)
+
+
+def create_traces(in_data, cols, colors, hoverinfo, names, errors,
+                  error_barwidth, as_dict=False, serialized=False):
+    """Creates the traces of `cols`
+
+    If `as_dict` or `serialized` is True, the traces share the index of
+    `in_data`. If `serialized` is True, traces are returned as plain
+    dicts holding arrays, see `helpers.map_columns`.
+
+    """
+    x = in_data.index if as_dict or serialized else None
 
+    traces = list()
+    for col in cols:
+        trace = create_trace(in_data, colors, col, hoverinfo, names, errors,
+                             error_barwidth, x, as_dict=as_dict)
 
+        if serialized:
+            if as_dict:
+                trace = go.Bar(trace)
+            trace = trace.to_plotly_json()
+
+        traces.append(trace)
+
+    return traces
+
+
+@helpers.memory_tracked
 def create_graph(in_data, names='', colors='', errors='', error_barwidth=4, 
                  title='title', xlab='xlab', ylab='ylab', y2lab='y2lab',
                  hoverinfo=None, annotations=[], filepath='', aux_traces=[],
                  layout='', alt_y=False, aux_first=False, figonly=False,
-                 imagesize=None):
+                 imagesize=None, memory_budget=None, workers=None,
+                 executor='process', chunksize=None):
     """Creates grouped barplot
 
     The `in_data` arg must be a dataframe in the form:
@@ -159,6 +199,18 @@ def create_graph(in_data, names='', colors='', errors='', error_barwidth=4,
 
     alt_y : bool, used to place aux_traces on alternate axis. 
 
+    memory_budget : optional, a budget in bytes for the trace arrays,
+    see `helpers.budget_factor`. Bars are never downsampled.
+
+    workers : optional, the number of workers used to build traces, see
+    `lineplot.create_graph` and `helpers.map_columns`. Traces keep the
+    order of the columns.
+
+    executor : 'process' or 'thread', the kind of pool used if
+    `workers` is passed.
+
+    chunksize : optional, the number of columns per chunk.
+
     """
     # use default colors if none are passed
     # otherwise use passed dataframe
@@ -175,10 +227,19 @@ def create_graph(in_data, names='', colors='', errors='', error_barwidth=4,
     if alt_y:
         yaxis='y1' 
 
-    # create and append traces 
-    for col in in_data.columns:
-        data.append(create_trace(in_data, colors, col, hoverinfo, names,
-                                 errors, error_barwidth))
+    # if there is a memory budget, share the index between traces
+    if memory_budget is not None:
+        helpers.budget_factor(helpers.estimate_payload(in_data),
+                              memory_budget, 'barplot.create_graph',
+                              downsample=False)
+
+    # create and append traces, in chunks across a pool if `workers`
+    data += helpers.map_columns(
+        create_traces, in_data, in_data.columns, workers=workers,
+        executor=executor, chunksize=chunksize, colors=colors,
+        hoverinfo=hoverinfo, names=names, errors=errors,
+        error_barwidth=error_barwidth, as_dict=memory_budget is not None
+    )
 
     # if more than one trace, add multiple traces...
     # ... and change order of traces depending on aux_first
@@ -0,0 +1,232 @@
+"""Command line interface for batch rendering graphs from spec files
+
+Use `rapid-plotly render specs.yaml` to render every figure described in
+a JSON or YAML spec file, for example:
+
+    ```
+    data:
+      cars:
+        path: mtcars.csv
+        read_args: {sep: ','}
+
+    figures:
+      - name: mpg-by-car
+        type: barplot
+        data: cars
+        query: cyl > 4
+        columns: [mpg]
+        args: {title: MPG, ylab: mpg}
+        output: [mpg.html, mpg.png]
+
+      - name: weight-vs-mpg
+        type: scatterplot
+        data: cars
+        x: [wt]
+        y: [mpg]
+        output: wt-mpg.html
+    ```
+
+Each entry in `data` is a CSV or Parquet file, which is read once no
+matter how many figures use it. Relative paths are resolved against the
+directory of the spec file, and `read_args` are passed to
+`pd.read_csv` or `pd.read_parquet`. A figure can also use `index` to set a
+column as the index of its data. Keys in `args` are passed to the
+`create_graph` function of the module named by `type`.
+
+Figures are rendered across a pool of worker processes, and the time
+taken by each figure is printed along with a summary.
+
+Use `rapid-plotly serve` to run a local render server, see the `server`
+module.
+
+"""
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import json
+import os
+import sys
+import time
+import pandas as pd
+from . import helpers, server
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+# data shared with worker processes, set by `init_worker`
+frames = dict()
+
+
+def load_spec(fp):
+    """Reads a JSON or YAML spec file"""
+    with open(fp) as f:
+        text = f.read()
+
+    if fp.endswith('.json'):
+        return json.loads(text)
+
+    if yaml is None:
+        raise ImportError('PyYAML is required to read %s, install it or '
+                          'use a .json spec file' % fp)
+
+    return yaml.safe_load(text)
+
+
+def resolve(path, basedir):
+    """Resolves `path` against `basedir` unless it is absolute"""
+    return os.path.join(basedir, os.path.expanduser(path))
+
+
+def load_data(source, basedir):
+    """Reads a CSV or Parquet data source into a DataFrame"""
+    if isinstance(source, str):
+        source = {'path': source}
+
+    fp = resolve(source['path'], basedir)
+    read_args = source.get('read_args', {})
+
+    if fp.endswith('.parquet') or fp.endswith('.pq'):
+        return pd.read_parquet(fp, **read_args)
+
+    return pd.read_csv(fp, **read_args)
+
+
+def select_data(df, spec):
+    """Applies the `query`, `index` and `columns` keys of a figure spec"""
+    if 'query' in spec:
+        df = df.query(spec['query'])
+
+    if 'index' in spec:
+        df = df.set_index(spec['index'])
+
+    if 'columns' in spec:
+        df = df[spec['columns']]
+
+    return df
+
+
+def init_worker(data):
+    """Makes the loaded data available to a worker process"""
+    frames.update(data)
+
+
+def render_figure(spec, basedir):
+    """Renders a single figure spec, returns the seconds taken
+
+    The figure is created by `server.build_figure`.
+
+    """
+    start = time.perf_counter()
+
+    df = select_data(frames[spec['data']], spec)
+    args = spec.get('args', {})
+
+    outputs = spec['output']
+    if isinstance(outputs, str):
+        outputs = [outputs]
+    outputs = [resolve(x, basedir) for x in outputs]
+
+    for fp in outputs:
+        os.makedirs(os.path.dirname(fp) or '.', exist_ok=True)
+
+    if spec['type'] == 'scatterplot':
+        df = (df[spec['x']], df[spec['y']])
+
+    fig = server.build_figure(spec, df, filepath=outputs[0])
+
+    # any further outputs are written from the same figure
+    for fp in outputs[1:]:
+        if 'imagesize' in args:
+            width, height = args['imagesize']
+            helpers.output_graph(fig, fp, width=width, height=height)
+        else:
+            helpers.output_graph(fig, fp)
+
+    return time.perf_counter() - start
+
+
+def render(fp, workers=None, out=sys.stdout):
+    """Renders every figure in the spec file `fp`
+
+    Returns the number of figures that failed to render.
+
+    """
+    spec = load_spec(fp)
+    basedir = os.path.dirname(os.path.abspath(fp))
+    figures = spec.get('figures', [])
+
+    # load each data source once, before any figure is rendered
+    start = time.perf_counter()
+    data = dict()
+    for name, source in spec.get('data', {}).items():
+        data[name] = load_data(source, basedir)
+    load_time = time.perf_counter() - start
+
+    out.write('loaded %d data sources in %.3fs\n' % (len(data), load_time))
+
+    names = [f.get('name', 'figure-%d' % i) for i, f in enumerate(figures)]
+    failed = 0
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(data,)) as pool:
+        futures = [pool.submit(render_figure, f, basedir) for f in figures]
+
+        for name, future in zip(names, futures):
+            try:
+                seconds = future.result()
+                out.write('%-30s %8.3fs\n' % (name, seconds))
+
+            except Exception as e:
+                failed += 1
+                out.write('%-30s   FAILED %s: %s\n'
+                          % (name, type(e).__name__, e))
+
+    total = time.perf_counter() - start
+    out.write('rendered %d of %d figures in %.3fs\n'
+              % (len(figures) - failed, len(figures), total))
+
+    return failed
+
+
+def main(argv=None):
+    """Entry point for the `rapid-plotly` command"""
+    parser = argparse.ArgumentParser(
+        prog='rapid-plotly',
+        description='Batch render rapid_plotly graphs from spec files.')
+    sub = parser.add_subparsers(dest='command')
+    sub.required = True
+
+    p = sub.add_parser('render', help='render figures from spec files')
+    p.add_argument('specs', nargs='+', help='JSON or YAML spec files')
+    p.add_argument('-j', '--workers', type=int, default=None,
+                   help='number of worker processes, defaults to the '
+                        'number of CPUs')
+
+    p = sub.add_parser('serve', help='run a local render server')
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=8050)
+    p.add_argument('--cache-size', type=int, default=128,
+                   help='number of rendered graphs to keep in memory')
+    p.add_argument('--cache-mb', type=float, default=64,
+                   help='megabytes of rendered graphs to keep in memory')
+    p.add_argument('-q', '--quiet', action='store_true',
+                   help="don't log every request")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        server.serve(args.host, args.port, args.cache_size, args.quiet,
+                     int(args.cache_mb * 2 ** 20))
+        return 0
+
+    failed = 0
+    for fp in args.specs:
+        failed += render(fp, workers=args.workers)
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
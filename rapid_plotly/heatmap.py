@@ -0,0 +1,259 @@
+"""Convenience function for creating a Plotly heatmap
+
+Use `create_graph` to create an attractive, highly interactive Plotly
+heatmap, either in a Jupyter notebook or as an html file.
+
+Large matrices (e.g. correlation matrices over thousands of features or
+time x sensor grids) are block-aggregated down to `max_shape` before
+being passed to Plotly, so the size of the figure depends on `max_shape`
+rather than on the size of `in_data`.
+
+"""
+import plotly.graph_objs as go
+from plotly.offline import download_plotlyjs, init_notebook_mode, plot, iplot
+from numpy.lib.stride_tricks import as_strided
+import warnings
+import numpy as np
+import pandas as pd
+from . import helpers
+output_graph = helpers.output_graph
+
+# reductions available for `how`, NaN cells are ignored
+pool_funcs = {'mean': np.nansum, 'max': np.nanmax}
+
+
+def load_matrix(in_data):
+    """Returns a 2D array and row/column labels for `in_data`
+
+    `in_data` can be a DataFrame, a 2D array or a path to a `.npy` file.
+    A `.npy` file is memory-mapped rather than read into memory.
+
+    """
+    if isinstance(in_data, str):
+        arr = np.load(in_data, mmap_mode='r')
+        rows, cols = np.arange(arr.shape[0]), np.arange(arr.shape[1])
+
+    elif isinstance(in_data, pd.DataFrame):
+        arr = in_data.values
+        rows, cols = in_data.index, in_data.columns
+
+    else:
+        arr = in_data
+        rows, cols = np.arange(arr.shape[0]), np.arange(arr.shape[1])
+
+    if arr.ndim != 2:
+        raise ValueError('heatmap data must be 2D, got shape %s'
+                         % (arr.shape,))
+
+    return arr, rows, cols
+
+
+def pool_rows(arr, factor, how='mean'):
+    """Pools `arr` along its first axis in blocks of `factor` rows
+
+    Full blocks are reduced through a strided view of `arr`, so no copy
+    of `arr` is made. A trailing partial block is reduced separately.
+    For 'mean' the blocks are summed, see `block_aggregate`.
+
+    """
+    func = pool_funcs[how]
+    n = arr.shape[0]
+    full = n // factor
+
+    s0 = arr.strides[0]
+    blocks = as_strided(arr, shape=(full, factor) + arr.shape[1:],
+                        strides=(s0 * factor, s0) + arr.strides[1:],
+                        writeable=False)
+    # a block of only NaN cells is NaN, without warning
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        out = func(blocks, axis=1)
+
+        if n % factor:
+            rest = func(arr[full * factor:], axis=0)
+            out = np.concatenate([out, rest[np.newaxis]])
+
+    return out
+
+
+def block_aggregate(arr, max_shape=(500, 500), how='mean',
+                    chunksize=2**24):
+    """Block-aggregates `arr` down to at most `max_shape`
+
+    Returns the aggregated array and the `(row, col)` block size. Each
+    cell in the result is the mean or max (per `how`) of a block of
+    cells in `arr`. NaN cells are ignored, so a block is only NaN when
+    all of its cells are NaN.
+
+    `arr` is read `chunksize` elements at a time, so a memory-mapped
+    array is never fully loaded into memory.
+
+    """
+    if how not in pool_funcs:
+        raise ValueError('how must be one of %s, got %r'
+                         % (sorted(pool_funcs), how))
+
+    nrows, ncols = arr.shape
+    fy = max(1, int(np.ceil(nrows / max_shape[0])))
+    fx = max(1, int(np.ceil(ncols / max_shape[1])))
+
+    if fy == 1 and fx == 1:
+        return np.asarray(arr, dtype=float), (fy, fx)
+
+    # number of input rows read per chunk, a multiple of the block height
+    step = max(1, chunksize // (fy * ncols)) * fy
+
+    out = list()
+    for start in range(0, nrows, step):
+        sl = np.asarray(arr[start:start + step], dtype=float)
+
+        if how == 'mean':
+            # sum the non-NaN cells and count them, so the mean of a
+            # block doesn't depend on how its NaN cells are spread
+            valid = (~np.isnan(sl)).astype(float)
+            total = pool_rows(pool_rows(sl, fy, how).T, fx, how).T
+            count = pool_rows(pool_rows(valid, fy, how).T, fx, how).T
+            with np.errstate(invalid='ignore'):
+                out.append(total / count)
+
+        else:
+            sl = pool_rows(sl, fy, how)
+            out.append(pool_rows(sl.T, fx, how).T)
+
+    return np.concatenate(out), (fy, fx)
+
+
+def create_colorscale(colors):
+    """Creates an evenly spaced Plotly colorscale from a list of colors"""
+    if len(colors) == 1:
+        colors = colors * 2
+
+    steps = np.linspace(0, 1, len(colors))
+
+    return [[float(s), c] for s, c in zip(steps, colors)]
+
+
+def create_trace(z, rows, cols, colorscale, hoverinfo):
+    """Creates a heatmap trace"""
+    trace = go.Heatmap(
+        z=z,
+        x=list(cols),
+        y=list(rows),
+        colorscale=colorscale,
+        hoverinfo=hoverinfo,
+    )
+
+    return trace
+
+
+def create_graph(in_data, colors='', how='mean', max_shape=(500, 500),
+                 title='title', xlab='xlab', ylab='ylab', hoverinfo=None,
+                 annotations=[], filepath='', aux_traces=[], layout='',
+                 figonly=False, imagesize=None):
+    """Creates a heatmap
+
+    The `in_data` arg is a 2D matrix where each cell is a value to be
+    colored, for example a correlation matrix:
+
+                 a        b        c
+    a         1.00     0.31    -0.12
+    b         0.31     1.00     0.54
+    c        -0.12     0.54     1.00
+
+    If `in_data` is larger than `max_shape`, it is aggregated into
+    blocks of cells so that the graph has at most `max_shape` cells.
+    Blocks are labeled by the first row and column of the block.
+
+    Parameters
+    ----------
+    in_data : DataFrame, 2D array or path to a `.npy` file. A `.npy`
+    file is memory-mapped, so it is not fully loaded into memory.
+
+    colors : list of colors, evenly spaced from the lowest to the
+    highest value. By default, the first three colors from
+    `helpers.default_colors` are used.
+
+    how : either 'mean' or 'max', how blocks of cells are aggregated.
+    NaN cells are ignored.
+
+    max_shape : tuple of `(rows, columns)`, the maximum number of cells
+    in the graph along each axis.
+
+    title : title for top of graph. Use '<br>' tag for subtitle. Tags
+    '<i>' and '<b>' can be used for italics and bold, respectively.
+
+    xlab : label for x-axis.
+
+    ylab : label for y-ayis.
+
+    hoverinfo : passed to the trace in `create_trace`. By default,
+    Plotly displays the x, y and z values upon hover.
+
+    annotations : a list of dicts for annotations. For example:
+
+        ```
+        [{'text':'Strongly correlated', 'x':1, 'y':2,
+        'showarrow':False}]
+        ```
+
+    The 'x' and 'y' keys are coordinates in terms of the graph axes, and
+    the 'text' key is the annotation text.
+
+    filepath : optional, if included will write image to file. Can be
+    written as a .html file or a .png file.
+
+    aux_traces : list of traces to be added to the graph data. Allows
+    for customization of additional traces beyond what default
+    functionality provides.
+
+    layout : allows for a customized layout. Default layout is in the
+    helpers module, can be accessed:
+
+        ```
+        from rapid_plotly import helpers
+        layout = helpers.layout
+        ```
+
+    """
+    # use default colors if none are passed
+    if isinstance(colors, str):
+        colors = list(helpers.default_colors(range(3)).values())
+
+    arr, rows, cols = load_matrix(in_data)
+    z, (fy, fx) = block_aggregate(arr, max_shape=max_shape, how=how)
+
+    # label each block by its first row and column
+    rows, cols = rows[::fy], cols[::fx]
+
+    # create list of traces
+    data = [create_trace(z, rows, cols, create_colorscale(colors),
+                         hoverinfo)]
+
+    if len(aux_traces) > 0:
+        data = data + aux_traces
+
+    # create layout
+    # if no layout is passed, use default layout from helpers
+    if layout == '':
+        layout = helpers.layout
+
+    layout['title'] = title
+    layout['xaxis']['title'] = xlab
+    layout['yaxis']['title'] = ylab
+    layout['annotations'] = annotations
+    layout = go.Layout(layout)
+
+    # create figure
+    fig = go.Figure(data=data, layout=layout)
+
+    # output graph
+    # setup imagesize, used only for pngs
+    if not imagesize:
+        output_graph(filepath=filepath, fig=fig, figonly=figonly)
+
+    else:
+        width, height = imagesize
+        output_graph(filepath=filepath, fig=fig, figonly=figonly,
+                     width=width, height=height)
+
+    return fig
@@ -1,10 +1,21 @@
 """Misc helper functions used across multiple types of graphs"""
 import plotly.graph_objs as go
-from plotly.offline import download_plotlyjs, init_notebook_mode, plot, iplot
+from plotly.offline import download_plotlyjs, init_notebook_mode, plot
+from plotly.offline import get_plotlyjs
 import numpy as np
 import plotly.io as pio
 import pandas as pd
-from PIL import Image
+from PIL import Image, ImageColor
+import io
+import os
+import json
+import uuid
+import functools
+import tracemalloc
+import warnings
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from . import serialize
 
 # default layout
 layout = {
@@ -18,11 +29,101 @@ layout = {
 }
 
 
+# page used by `figure_html`, mirrors the page written by `plot`
+html_template = """<!doctype html>
+<html>
+<head>
+    <meta charset="utf-8" />
+    <style>html, body {{height: 100%;}}</style>
+</head>
+<body>
+    <div style="height:100%; width:100%;">
+        {plotlyjs}
+        <div id="{div_id}" class="plotly-graph-div" style="height:100%; width:100%;"></div>
+        <script>
+            Plotly.newPlot("{div_id}", {data}, {layout}, {{"responsive": true}}).then(function() {{
+                {post_script}
+            }});
+        </script>
+    </div>
+</body>
+</html>"""
+
+# output of `notebook_bundle`, `init_notebook` may load plotly.js
+# asynchronously, so the figure is drawn once `window.Plotly` is defined,
+# waiting up to 10 seconds before showing an error in the div
+notebook_template = """<div id="{div_id}" class="plotly-graph-div" style="height:525px; width:100%;"></div>
+<script type="text/javascript">
+    (function() {{
+        var fig = {fig};
+        var gd = document.getElementById("{div_id}");
+        var tries = 0;
+        if (fig.layout && fig.layout.height) {{
+            gd.style.height = fig.layout.height + "px";
+        }}
+        function draw() {{
+            if (window.Plotly === undefined) {{
+                if (++tries > 500) {{
+                    gd.style.height = "auto";
+                    gd.textContent = "plotly.js did not load, run " +
+                        "rapid_plotly.helpers.init_notebook(force=True) " +
+                        "and show the figure again.";
+                    return;
+                }}
+                setTimeout(draw, 20);
+                return;
+            }}
+            Plotly.newPlot("{div_id}", fig.data, fig.layout, {{"responsive": true}});
+        }}
+        draw();
+    }})();
+</script>"""
+
+# plotly.js bundle, read once by `figure_html`
+plotlyjs = None
+
+# set by `init_notebook` once plotly.js is loaded in the notebook
+notebook_initialized = False
+
+# display ids shown by `show`, later calls with one of these update it
+displayed_ids = set()
+
+# reports of the calls made with a `memory_budget`, see `memory_tracked`
+memory_reports = deque(maxlen=100)
+
+# formats that can be rotated in memory by `rotate_bytes`
+raster_formats = ['png', 'jpg', 'jpeg', 'webp']
+
+# kinds of pool used by `map_column_groups`
+executors = ['process', 'thread']
+
+# file extensions `output_graph` can write, same as the formats of
+# `to_bytes`
+file_formats = ['html', 'json', 'svg', 'pdf'] + raster_formats
+
+
 def image_rotate(fp1, fp2):
-    """Transposes an image at a path, writes to new path"""
+    """Transposes an image at a path, writes to new path
+
+    Either path can also be a file-like object.
+
+    """
     im = Image.open(fp1)
+    fmt = im.format
     im = im.transpose(Image.ROTATE_90)
-    im.save(fp2)
+
+    if isinstance(fp2, str):
+        im.save(fp2)
+    else:
+        im.save(fp2, format=fmt)
+
+
+def rotate_bytes(data):
+    """Transposes an encoded image held in memory, returns new bytes"""
+    buf = io.BytesIO()
+    image_rotate(io.BytesIO(data), buf)
+
+    return buf.getvalue()
 
 
 def generate_annotations(in_data, textangle=0, vertical_offset=0.05,
@@ -116,7 +217,8 @@ def create_band(sl, color='rgba(26,150,65,0.25)', upper_col='upper',
     the list of traces. 
 
     TODO: lower line is visible on band, need to set the opacity or 
-    something to make the lower line invisible. 
+    something to make the lower line invisible. `create_fan` builds
+    each band as a single polygon, which doesn't have this problem.
 
     """
     band_lower = go.Scatter(
@@ -146,48 +248,656 @@ def create_band(sl, color='rgba(26,150,65,0.25)', upper_col='upper',
     return [band_lower, band_upper]
 
 
+def minmax_indices(y, bucket):
+    """Returns sorted positions of the min and max of `y` in each bucket
+
+    `y` is split into consecutive buckets of `bucket` values, and the
+    positions of the smallest and largest value in each bucket are kept,
+    so peaks survive downsampling. The first and last positions are
+    always kept, so that lines reach both ends of the data. NaN values
+    are only kept when a bucket holds nothing else.
+
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n == 0:
+        return np.arange(0)
+    nbuckets = -(-n // bucket)
+    pad = nbuckets * bucket - n
+
+    lo = np.where(np.isnan(y), np.inf, y)
+    lo = np.concatenate([lo, np.full(pad, np.inf)]).reshape(nbuckets, bucket)
+    hi = np.where(np.isnan(y), -np.inf, y)
+    hi = np.concatenate([hi, np.full(pad, -np.inf)]).reshape(nbuckets, bucket)
+
+    start = np.arange(nbuckets) * bucket
+    idx = np.concatenate([start + lo.argmin(axis=1),
+                          start + hi.argmax(axis=1), [0, n - 1]])
+
+    return np.unique(idx)
+
+
+def minmax_pyramid(y, max_points=2000):
+    """Creates a min/max aggregation pyramid of `y`
+
+    Returns a list of position arrays, from the coarsest level, which
+    has at most `max_points` points, to the finest level. Each level
+    halves the bucket size of the previous one. Full resolution is not
+    included, since it is simply every position in `y`.
+
+    """
+    # two points are kept for the ends, see `minmax_indices`
+    bucket = -(-len(y) // max(1, (max_points - 2) // 2))
+
+    # a bucket of 2 keeps every point, same as full resolution
+    levels = list()
+    while bucket > 2:
+        levels.append(minmax_indices(y, bucket))
+        bucket = -(-bucket // 2)
+
+    return levels
+
+
+def figure_html(data_json, layout_json, include_plotlyjs=True,
+                post_script=None, div_id='graph'):
+    """Creates a full `.html` page from an already serialized figure
+
+    `data_json` and `layout_json` are JSON strings of the list of traces
+    and of the layout, they are written into the page as is. Like
+    `output_graph`, '{plot_id}' in `post_script` is replaced by the id
+    of the graph div.
+
+    If `include_plotlyjs` is a string, the page loads plotly.js from that
+    URL rather than embedding the bundle.
+
+    """
+    global plotlyjs
+
+    script = ''
+    if isinstance(include_plotlyjs, str):
+        script = '<script src="%s"></script>' % include_plotlyjs
+
+    elif include_plotlyjs:
+        if plotlyjs is None:
+            plotlyjs = get_plotlyjs()
+        script = '<script>%s</script>' % plotlyjs
+
+    post_script = (post_script or '').replace('{plot_id}', div_id)
+
+    return html_template.format(plotlyjs=script, div_id=div_id,
+                                data=data_json, layout=layout_json,
+                                post_script=post_script)
+
+
+def to_rgba(color, alpha):
+    """Converts a color to an 'rgba' string
+
+    `color` is a hex string, e.g. '#1a9641', an 'rgb(r,g,b)' or
+    'rgba(r,g,b,a)' string or a CSS color name, e.g. 'red'.
+
+    """
+    try:
+        if '(' in color:
+            inner = color[color.index('(') + 1:color.index(')')]
+            rgb = [int(float(x)) for x in inner.split(',')[:3]]
+        else:
+            rgb = ImageColor.getrgb(color)[:3]
+
+    except (ValueError, TypeError):
+        raise ValueError("color must be a hex string, 'rgb(r,g,b)' or a "
+                         "CSS color name, got %r" % (color,))
+
+    return 'rgba(%d,%d,%d,%s)' % (rgb[0], rgb[1], rgb[2], round(alpha, 4))
+
+
+def create_fan(sl, color='rgb(26,150,65)', opacity=(0.1, 0.4),
+               max_points=None, cols=None):
+    """Creates traces that form a fan chart of quantile bands
+
+    `sl` is a DataFrame of quantiles with the index as the x-axis, e.g.
+    with columns 0.05, 0.25, 0.5, 0.75, 0.95. Columns are paired from
+    the outside in, (0.05, 0.95) then (0.25, 0.75), and each pair is
+    drawn as one band. A middle column left over, e.g. the median, isn't
+    drawn and can be added as a line trace. Use `cols` to pass the
+    quantile columns in ascending order if `sl` has other columns or
+    isn't in ascending order.
+
+    Each band is a single closed `fill='toself'` polygon, so there is
+    one trace per band rather than two as in `create_band`, and no
+    lower line is visible.
+
+    `color` is a hex, 'rgb' or named color, see `to_rgba`. `opacity` is
+    a tuple of the opacity of the outermost and innermost bands, opacity
+    is ramped linearly in between. Bands overlap, so inner bands appear
+    darker.
+
+    If `max_points` is passed and `sl` has more rows, the index is
+    downsampled into buckets, using the min of the lower quantile and
+    the max of the upper quantile in each bucket, so bands are never
+    drawn narrower than the data.
+
+    The result will probably be best if these are the first traces in
+    the list of traces.
+
+    """
+    if cols is None:
+        cols = list(sl.columns)
+
+    x = np.asarray(sl.index)
+    values = sl[cols].to_numpy(dtype=float)
+
+    starts = None
+    if max_points and len(x) > max_points:
+        bucket = -(-len(x) // max_points)
+        starts = np.arange(0, len(x), bucket)
+        x = x[starts]
+
+    nbands = len(cols) // 2
+    alphas = np.linspace(opacity[0], opacity[-1], max(nbands, 1))
+
+    traces = list()
+    for i in range(nbands):
+        lower, upper = values[:, i], values[:, -(i + 1)]
+
+        if starts is not None:
+            lower = np.fmin.reduceat(lower, starts)
+            upper = np.fmax.reduceat(upper, starts)
+
+        # trace the lower edge left to right, then the upper edge back
+        trace = go.Scatter(
+            x=np.concatenate([x, x[::-1]]),
+            y=np.concatenate([lower, upper[::-1]]),
+            name='%s-%s' % (cols[i], cols[-(i + 1)]),
+            mode='none',
+            fill='toself',
+            fillcolor=to_rgba(color, alphas[i]),
+            showlegend=False,
+            hoverinfo='none',
+        )
+        traces.append(trace)
+
+    return traces
+
+
+def to_bytes(fig, fmt='png', width=680, height=520, scale=None,
+             orient='horizontal', rotate=False, serializer=None,
+             float_precision=None, include_plotlyjs=True):
+    """Returns plotly graph encoded as bytes
+
+    `fmt` can be 'png', 'jpg', 'webp', 'svg', 'pdf', 'html' or 'json'.
+    If a list of formats is passed, a dict of format to bytes is
+    returned. The figure is converted to a dict once, 'html' and 'json'
+    share a single JSON encoding of it, and each image format is encoded
+    again by the image export engine.
+
+    If `orient` is 'vertical', then width and height are swapped. If
+    `rotate` is also True, raster images are rotated in memory, as
+    `image_rotate` would do on disk.
+
+    `serializer` and `float_precision` are used for 'html' and 'json',
+    see `output_graph`. `include_plotlyjs` is passed to `figure_html`.
+
+    """
+    formats = [fmt] if isinstance(fmt, str) else list(fmt)
+    text = 'html' in formats or 'json' in formats
+
+    if orient == 'vertical':
+        # swap width and height param
+        c = (width, height)
+        height, width = c
+
+    # every format is rendered from the same dict, only created if
+    # Plotly encodes the figure
+    fig_dict = fig
+    if not isinstance(fig, dict) and (
+            not serializer or any(f not in ['html', 'json'] for f in formats)):
+        fig_dict = fig.to_dict()
+
+    if text and serializer:
+        data_json, layout_json = serialize.figure_json(
+            fig, serializer, float_precision)
+
+    elif text:
+        data_json = pio.json.to_json_plotly(fig_dict.get('data', []))
+        layout_json = pio.json.to_json_plotly(fig_dict.get('layout', {}))
+
+    out = dict()
+    for f in formats:
+        if f == 'html':
+            data = figure_html(data_json, layout_json,
+                               include_plotlyjs=include_plotlyjs,
+                               div_id=uuid.uuid4().hex).encode('utf-8')
+
+        elif f == 'json':
+            data = ('{"data":%s,"layout":%s}'
+                    % (data_json, layout_json)).encode('utf-8')
+
+        else:
+            data = pio.to_image(fig_dict, format=f, width=width,
+                                height=height, scale=scale, validate=False)
+
+            if orient == 'vertical' and rotate and f in raster_formats:
+                data = rotate_bytes(data)
+
+        out[f] = data
+
+    if isinstance(fmt, str):
+        return out[fmt]
+
+    return out
+
+
 def to_image(fig, filepath, width=680, height=520, scale=None,
-             orient='horizontal'):
+             orient='horizontal', fmt=None, rotate=False, serializer=None,
+             float_precision=None):
     """Writes plotly graph to image
 
     If `orient` is 'vertical', then width and height are swapped.
 
+    `filepath` can also be a file-like object, in which case `fmt` must
+    be passed, see `to_bytes`, which `serializer` and `float_precision`
+    are passed to.
+
     TODO - experiment with the scale param, see [here][1], might make 
     for better graphs sometimes
 
     [1]: https://plot.ly/python/static-image-export/
     """
+    if fmt is None and not isinstance(filepath, str):
+        raise ValueError('fmt must be passed when writing to a file-like '
+                         'object, e.g. fmt=\'png\'')
+
+    if not isinstance(filepath, str) or rotate:
+        if fmt is None:
+            fmt = filepath.rsplit('.', 1)[-1].lower()
+
+        data = to_bytes(fig, fmt=fmt, width=width, height=height,
+                        scale=scale, orient=orient, rotate=rotate,
+                        serializer=serializer,
+                        float_precision=float_precision)
+
+        if isinstance(filepath, str):
+            with open(filepath, 'wb') as f:
+                f.write(data)
+        else:
+            filepath.write(data)
+
+        return
+
     if orient == 'vertical':
         # swap width and height param
         c = (width, height)
         height, width = c
 
-    pio.write_image(fig, filepath, width=width, height=height, scale=scale)
+    pio.write_image(fig, filepath, format=fmt, width=width, height=height,
+                    scale=scale)
     
 
+def init_notebook(connected=True, force=False):
+    """Loads plotly.js into the notebook, once per kernel
+
+    Pass `force=True` to load it again, e.g. after the output holding
+    it was cleared or plotly.js failed to load.
+
+    """
+    global notebook_initialized
+
+    if force or not notebook_initialized:
+        init_notebook_mode(connected=connected)
+        notebook_initialized = True
+
+
+def notebook_bundle(fig, mimetype='text/html', binary=False):
+    """Creates the display data for a figure in a notebook
+
+    Only one `mimetype` is included, 'text/html' for the classic
+    notebook or 'application/vnd.plotly.v1+json' for JupyterLab, so that
+    the figure isn't stored twice in the notebook file. The 'text/html'
+    output waits for plotly.js to be loaded before drawing, see
+    `notebook_template`.
+
+    `binary` can be True to encode numeric arrays as base64 typed arrays,
+    or 'f4' to also write floats in single precision, halving their
+    size, see `serialize.typed_arrays`.
+
+    `fig` can also be a JSON string of a figure, e.g. from a
+    `FigureSession`, which is written into the 'text/html' output as is.
+
+    """
+    if isinstance(fig, str):
+        if mimetype == 'text/html' and not binary:
+            html = notebook_template.format(div_id=uuid.uuid4().hex,
+                                            fig=fig)
+            return {mimetype: html}
+
+        fig = json.loads(fig)
+
+    if isinstance(fig, dict):
+        fig_dict = fig
+    elif binary:
+        # read the arrays as held by the figure, as in `serialize`
+        fig_dict = {'data': fig._data, 'layout': fig._layout}
+    else:
+        fig_dict = fig.to_plotly_json()
+
+    if binary:
+        float_dtype = 'f4' if binary == 'f4' else 'f8'
+        fig_dict = {
+            'data': serialize.typed_arrays(fig_dict.get('data', []),
+                                           float_dtype),
+            'layout': fig_dict.get('layout', {}),
+        }
+
+    if mimetype == 'text/html':
+        fig_json = pio.to_json({'data': fig_dict.get('data', []),
+                                'layout': fig_dict.get('layout', {})},
+                               validate=False)
+        html = notebook_template.format(div_id=uuid.uuid4().hex,
+                                        fig=fig_json)
+        return {mimetype: html}
+
+    return {mimetype: {'data': fig_dict.get('data', []),
+                       'layout': fig_dict.get('layout', {}),
+                       'config': {}}}
+
+
+class NotebookHandle(object):
+    """Handle to a figure displayed by `show`, use `update` to redraw
+    the figure in place"""
+
+    def __init__(self, display_id, mimetype='text/html', binary=False):
+        self.display_id = display_id
+        self.mimetype = mimetype
+        self.binary = binary
+
+    def update(self, fig):
+        """Replaces the displayed figure with `fig`"""
+        from IPython.display import update_display
+
+        bundle = notebook_bundle(fig, self.mimetype, self.binary)
+        update_display(bundle, raw=True, display_id=self.display_id)
+
+
+def show(fig, display_id=None, mimetype='text/html', binary=False,
+         force_init=False):
+    """Displays a figure in a notebook, returns a `NotebookHandle`
+
+    plotly.js is loaded only on the first call in a kernel, or again if
+    `force_init` is True, see `init_notebook`. If `display_id` has
+    already been shown, that output
+    is updated in place instead of appending a new output. Pass
+    `display_id=True` for a new unique id. See `notebook_bundle` for
+    `mimetype` and `binary`.
+
+    """
+    from IPython.display import display
+
+    if mimetype == 'text/html':
+        init_notebook(force=force_init)
+
+    if display_id is True:
+        display_id = uuid.uuid4().hex
+
+    handle = NotebookHandle(display_id, mimetype, binary)
+
+    if display_id in displayed_ids:
+        handle.update(fig)
+        return handle
+
+    bundle = notebook_bundle(fig, mimetype, binary)
+    if display_id is None:
+        display(bundle, raw=True)
+    else:
+        displayed_ids.add(display_id)
+        display(bundle, raw=True, display_id=display_id)
+
+    return handle
+
+
 def output_graph(fig, filepath, width=680, height=520, figonly=False,
-                 scale=None, orient='horizontal'):
+                 scale=None, orient='horizontal', fmt=None, rotate=False,
+                 post_script=None, serializer=None, float_precision=None,
+                 display_id=None, binary=False):
     """Given a Plotly fig, generates a graph
 
-    If `filepath` is an empty string, display inline notebook, otherwise
-    write a file to `filepath`. If `filepath` contains the file extension
-    `.html`, a full interactive `.html` file is generated, if the file
-    extension is `.png` a `.png` file is written.
+    If `filepath` is an empty string, display inline notebook through
+    `show`, where `display_id` and `binary` are used, otherwise write a
+    file to `filepath`, in the format given by its extension. If the
+    extension is `.html`, a full interactive `.html` file is generated,
+    if it is `.png` a `.png` file is written. Extensions `.jpg`,
+    `.jpeg`, `.webp`, `.svg` and `.pdf` are written the same way, see
+    `file_formats`. Any other extension raises a ValueError.
+
+    If `filepath` is a file-like object, the graph is written to it in
+    the format `fmt` without touching the disk, see `to_bytes`.
 
     For the `.png` option, `width` and `height` are in pixels.
 
+    For the `.html` option, `post_script` is javascript run after the
+    graph is drawn, where '{plot_id}' is replaced by the id of the graph
+    div.
+
+    If the extension is `.json`, the figure is written as JSON.
+
+    `serializer` is used for `.html` and `.json` files and file-like
+    objects, either None to use Plotly's encoder or a backend of `serialize.to_json`, e.g.
+    'auto'. With a `serializer`, `float_precision` is the number of
+    decimals floats are rounded to.
+
     """
-    if filepath == '':
-        init_notebook_mode(connected=True)
+    if not isinstance(filepath, str):
+        to_image(fig, filepath, width=width, height=height, scale=scale,
+                 orient=orient, fmt=fmt, rotate=rotate,
+                 serializer=serializer, float_precision=float_precision)
+
+    elif filepath == '':
         if not figonly:
-            iplot(fig)
-
-    elif '.html' in filepath:
-        plot(fig, filename=filepath, auto_open=False)
-        
-    elif '.png' in filepath:
-        to_image(fig, filepath, width=width, height=height, scale=scale, 
-                 orient=orient)
+            show(fig, display_id=display_id, binary=binary)
+
+    else:
+        ext = os.path.splitext(filepath)[1].lower().lstrip('.')
+        if ext not in file_formats:
+            raise ValueError('filepath must end with one of %s, got %r'
+                             % (', '.join('.' + x for x in file_formats),
+                                filepath))
+
+        if ext in ['html', 'json'] and serializer:
+            data_json, layout_json = serialize.figure_json(
+                fig, serializer, float_precision)
+            if ext == 'html':
+                text = figure_html(data_json, layout_json,
+                                   post_script=post_script)
+            else:
+                text = '{"data":%s,"layout":%s}' % (data_json, layout_json)
+
+            with open(filepath, 'w') as f:
+                f.write(text)
+
+        elif ext == 'json':
+            pio.write_json(fig, filepath)
+
+        elif ext == 'html' and post_script:
+            pio.write_html(fig, filepath, post_script=post_script,
+                           auto_open=False)
+
+        elif ext == 'html':
+            plot(fig, filename=filepath, auto_open=False)
+
+        else:
+            to_image(fig, filepath, width=width, height=height,
+                     scale=scale, orient=orient, fmt=ext, rotate=rotate)
+
+
+def estimate_payload(in_data, cols=None):
+    """Estimates the bytes of trace arrays built from `in_data`
+
+    Each column in `cols`, all columns by default, is assumed to be a
+    trace with its own copy of the index as 8-byte x values.
+
+    """
+    if cols is None:
+        cols = in_data.columns
+
+    index_bytes = len(in_data.index) * 8
+
+    return sum(in_data[col].nbytes + index_bytes for col in cols)
+
+
+def budget_factor(estimate, memory_budget, name='create_graph',
+                  downsample=True):
+    """Returns the factor to downsample rows by to fit `memory_budget`
+
+    Warns if the `estimate` of the payload, in bytes, exceeds the
+    budget. If `downsample` is False, only warns and returns 1.
+
+    This is the `memory_budget` of the `create_graph` functions. When a
+    budget is passed, traces are built with `as_dict=True`, as dicts
+    holding the data columns as is rather than a list of the index, so
+    the arrays are validated and copied only once, by `go.Figure`. The
+    call is also tracked by `memory_tracked`.
+
+    """
+    if memory_budget is None or estimate <= memory_budget:
+        return 1
+
+    factor = -(-estimate // max(1, memory_budget))
+
+    if downsample:
+        msg = 'downsampling rows by a factor of %d' % factor
+    else:
+        factor = 1
+        msg = 'graph is not downsampled'
+
+    warnings.warn('%s: estimated payload of %.1f MB exceeds the memory '
+                  'budget of %.1f MB, %s' % (name, estimate / 1e6,
+                                             memory_budget / 1e6, msg),
+                  ResourceWarning, stacklevel=3)
+
+    return factor
+
+
+def memory_tracked(func):
+    """Decorator recording the tracemalloc peak of calls to `func`
+
+    Only calls passing a `memory_budget` are tracked. A dict of the
+    function name, the peak in bytes and the budget is appended to
+    `memory_reports`. If tracemalloc is already tracing, its peak is
+    reset at the start of the call.
+
+    """
+    name = '%s.%s' % (func.__module__.split('.')[-1], func.__name__)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        budget = kwargs.get('memory_budget')
+        if budget is None:
+            return func(*args, **kwargs)
+
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        else:
+            tracemalloc.reset_peak()
+
+        start = tracemalloc.get_traced_memory()[0]
+        try:
+            return func(*args, **kwargs)
+
+        finally:
+            peak = tracemalloc.get_traced_memory()[1] - start
+            if started:
+                tracemalloc.stop()
+
+            memory_reports.append({'function': name, 'peak': peak,
+                                   'budget': budget})
+
+    return wrapper
+
+
+def map_columns(func, in_data, cols, workers=None, executor='process',
+                chunksize=None, **kwargs):
+    """Calls `func(in_data, cols, **kwargs)`, optionally across a pool
+
+    `func` returns a list with one item per column in `cols`, e.g. the
+    `create_traces` function of a graph module. See `map_column_groups`
+    for `workers`, `executor` and `chunksize`.
+
+    """
+    return map_column_groups(func, [(in_data, cols, kwargs)], workers,
+                             executor, chunksize)[0]
+
+
+def map_column_groups(func, groups, workers=None, executor='process',
+                      chunksize=None):
+    """Calls `func(in_data, cols, **kwargs)` for each group in one pass
+
+    `groups` is a list of `(in_data, cols, kwargs)` tuples, e.g. the
+    main and the alt axis columns of a lineplot. Returns a list of the
+    outputs of `func` for each group.
+
+    If `workers` is passed, the columns of every group are split into
+    chunks of `chunksize` columns, by default four chunks per worker,
+    and all the chunks are run across a single pool of `workers`
+    processes, or threads if `executor` is 'thread'. `serialized=True`
+    is passed to `func` so that traces come back as plain dicts of
+    arrays, which are cheap to send from a worker and to validate again
+    in `go.Figure`. Results keep the order of `cols`.
+
+    """
+    if executor not in executors:
+        raise ValueError('executor must be one of %s, got %r'
+                         % (executors, executor))
+
+    groups = [(in_data, list(cols), kwargs)
+              for in_data, cols, kwargs in groups]
+
+    if not workers:
+        return [func(in_data, cols, **kwargs)
+                for in_data, cols, kwargs in groups]
+
+    if chunksize is None:
+        total = sum(len(cols) for _, cols, _ in groups)
+        chunksize = max(1, -(-total // (workers * 4)))
+
+    # (group, in_data, chunk, kwargs) for every chunk of every group
+    tasks = [(g, in_data, cols[i:i + chunksize], kwargs)
+             for g, (in_data, cols, kwargs) in enumerate(groups)
+             for i in range(0, len(cols), chunksize)]
+
+    if len(tasks) < 2:
+        return [func(in_data, cols, serialized=True, **kwargs)
+                for in_data, cols, kwargs in groups]
+
+    def chunk_args(in_data, chunk, kwargs):
+        # processes are only sent the columns of their chunk, including
+        # those of DataFrame args such as `names` or `errors`
+        if executor == 'thread':
+            return in_data, kwargs
+
+        args = dict(kwargs)
+        for k, v in kwargs.items():
+            if isinstance(v, pd.DataFrame) and set(chunk) <= set(v.columns):
+                args[k] = v[chunk]
+
+        return in_data[chunk], args
+
+    if executor == 'thread':
+        pool = ThreadPoolExecutor(max_workers=workers)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+
+    out = [list() for _ in groups]
+    with pool:
+        futures = list()
+        for g, in_data, chunk, kwargs in tasks:
+            sl, args = chunk_args(in_data, chunk, kwargs)
+            futures.append((g, pool.submit(func, sl, chunk, serialized=True,
+                                           **args)))
+
+        for g, future in futures:
+            out[g].extend(future.result())
+
+    return out
 
 
 def default_colors(keys, colors=None, reverse=False):
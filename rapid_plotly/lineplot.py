@@ -7,34 +7,274 @@ barplot, either in a Jupyter notebook or as an html file.
 import plotly.graph_objs as go
 from plotly.offline import download_plotlyjs, init_notebook_mode, plot, iplot
 from copy import copy
+import json
 import numpy as np
 import pandas as pd
 from . import helpers
+from . import serialize
 output_graph = helpers.output_graph
 
 
-def create_trace(in_data, colors, col, hoverinfo, names, yaxis=None):
-    """Creates a lineplot trace for a column in `in_data`"""
-    trace = go.Scatter(
-        x=list(in_data.index),
+def create_trace(in_data, colors, col, hoverinfo, names, yaxis=None,
+                 x=None, as_dict=False):
+    """Creates a lineplot trace for a column in `in_data`
+
+    `x` defaults to a list of the index of `in_data`. If `as_dict` is
+    True, the trace is returned as a dict holding `in_data[col]` as is,
+    see `helpers.budget_factor`.
+
+    """
+    if x is None:
+        x = list(in_data.index)
+
+    trace = dict(
+        x=x,
         y=in_data[col],
         mode='lines',
         name=col,
         text=names[col],
-        marker=go.scatter.Marker(color=colors[col]),
+        marker=dict(color=colors[col]),
         hoverinfo=hoverinfo,
         yaxis=yaxis
     )
 
-    return trace
+    if as_dict:
+        return dict(trace, type='scatter')
+
+    return go.Scatter(**trace)
+
+
+def sample_indices(y, factor):
+    """Returns the positions of the min and max of `y` in buckets of
+    2 * `factor` values, roughly 1 / `factor` of the rows, keeping peaks"""
+    return helpers.minmax_indices(y, 2 * factor)
+
+
+def create_traces(in_data, cols, colors, hoverinfo, names, yaxis=None,
+                  pyramid=False, max_points=2000, factor=1, as_dict=False,
+                  serialized=False):
+    """Creates the traces of `cols`, returns a list of `(trace, levels)`
+
+    `levels` is the output of `helpers.minmax_pyramid` if `pyramid` is
+    True, otherwise None. If `factor` is more than 1, traces are drawn
+    from `sample_indices`. A `names` DataFrame is sliced with the same
+    rows, so hovertext stays aligned. If `serialized` is True, traces
+    are returned as plain dicts holding the index and columns as arrays,
+    so they can be sent back from a worker process cheaply, see
+    `helpers.map_columns`.
+
+    """
+    traces = list()
+    for col in cols:
+        sl = in_data
+        trace_names = names
+        levels = None
+        idx = None
+        if pyramid:
+            levels = helpers.minmax_pyramid(in_data[col], max_points)
+            if levels:
+                idx = levels[0]
+
+        elif factor > 1:
+            idx = sample_indices(in_data[col], factor)
+
+        if idx is not None:
+            sl = in_data[[col]].iloc[idx]
+            if isinstance(names, pd.DataFrame):
+                trace_names = {col: names[col].iloc[idx]}
+
+        x = sl.index if as_dict or serialized else None
+        trace = create_trace(sl, colors, col, hoverinfo, trace_names, yaxis,
+                             x, as_dict=as_dict)
+
+        if serialized:
+            if as_dict:
+                trace = go.Scatter(trace)
+            trace = trace.to_plotly_json()
+
+        traces.append((trace, levels))
+
+    return traces
+
+
+# javascript embedded in `.html` files by `create_graph` when `pyramid`
+# is True, swaps in the finest pyramid level that fits the visible range
+pyramid_js = """
+(function() {
+    var gd = document.getElementById('{plot_id}');
+    var pyr = %s;
+    var types = {f8: Float64Array, f4: Float32Array, i4: Int32Array,
+                 u4: Uint32Array, i2: Int16Array, u2: Uint16Array,
+                 i1: Int8Array, u1: Uint8Array};
+    var loaded = false;
+
+    // decodes a base64 typed array spec, see `serialize.typed_array`
+    function decode(spec) {
+        var s = atob(spec.bdata), bytes = new Uint8Array(s.length);
+        for (var i = 0; i < s.length; i++) { bytes[i] = s.charCodeAt(i); }
+        return new types[spec.dtype](bytes.buffer);
+    }
+
+    // arrays are only decoded on the first zoom
+    function load() {
+        if (loaded) { return; }
+        var xs = pyr.xs.map(decode);
+        pyr.traces.forEach(function(tr) {
+            tr.t = xs[tr.x];
+            tr.y = decode(tr.y);
+            tr.levels = tr.levels.map(decode);
+        });
+        loaded = true;
+    }
+
+    function toNum(v) {
+        if (pyr.xtype !== 'date' || typeof v === 'number') {
+            return Number(v);
+        }
+        v = String(v).replace(' ', 'T');
+        if (v.length === 10) { v += 'T00:00'; }
+        return Date.parse(v + 'Z');
+    }
+
+    // first i in `level` where the x position of `tr` is >= v
+    function lowerBound(tr, level, n, v) {
+        var lo = 0, hi = n;
+        while (lo < hi) {
+            var mid = (lo + hi) >> 1;
+            var x = level ? tr.t[level[mid]] : tr.t[mid];
+            if (x < v) { lo = mid + 1; } else { hi = mid; }
+        }
+        return lo;
+    }
+
+    function update(ev) {
+        var lo, hi;
+        if (ev['xaxis.range[0]'] !== undefined) {
+            lo = toNum(ev['xaxis.range[0]']);
+            hi = toNum(ev['xaxis.range[1]']);
+        } else if (ev['xaxis.range'] !== undefined) {
+            lo = toNum(ev['xaxis.range'][0]);
+            hi = toNum(ev['xaxis.range'][1]);
+        } else if (ev['xaxis.autorange']) {
+            lo = -Infinity;
+            hi = Infinity;
+        } else {
+            return;
+        }
+        load();
+
+        var xs = [], ys = [], indices = [];
+        pyr.traces.forEach(function(tr) {
+            var levels = tr.levels.concat([null]);
+            var level = levels[0], start = 0, end = 0;
+            for (var k = levels.length - 1; k >= 0; k--) {
+                var n = levels[k] ? levels[k].length : tr.t.length;
+                var a = lowerBound(tr, levels[k], n, lo);
+                var b = lowerBound(tr, levels[k], n, hi + 1e-9);
+                if (b - a <= pyr.maxPoints || k === 0) {
+                    // keep a point either side so lines reach the edges
+                    level = levels[k];
+                    start = Math.max(a - 1, 0);
+                    end = Math.min(b + 1, n);
+                    break;
+                }
+            }
+            var x = new Float64Array(end - start);
+            var y = new Float64Array(end - start);
+            for (var i = start; i < end; i++) {
+                var j = level ? level[i] : i;
+                x[i - start] = tr.t[j];
+                y[i - start] = tr.y[j];
+            }
+            xs.push(x);
+            ys.push(y);
+            indices.push(tr.index);
+        });
+
+        Plotly.restyle(gd, {x: xs, y: ys}, indices);
+    }
+
+    gd.on('plotly_relayout', update);
+})();
+"""
+
+
+def pyramid_x(index):
+    """Returns the x positions of `index` as floats, and the axis type
+
+    Dates are returned as milliseconds since the epoch, which plotly.js
+    reads as dates on a date axis.
+
+    """
+    if not index.is_monotonic_increasing:
+        raise ValueError('pyramid requires an index sorted in '
+                         'ascending order')
+
+    if isinstance(index, pd.DatetimeIndex):
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        us = index.values.astype('datetime64[us]').astype(np.int64)
+        return us / 1000, 'date'
+
+    if pd.api.types.is_numeric_dtype(index):
+        return np.asarray(index, dtype=float), 'linear'
+
+    raise ValueError('pyramid requires a numeric or datetime index')
+
+
+def create_pyramid_script(pyramids, max_points):
+    """Creates the javascript for a lineplot zoom pyramid
 
+    `pyramids` is a list of `(trace_index, y, levels)` tuples, where `y`
+    is the Series plotted by the trace and `levels` is the output of
+    `helpers.minmax_pyramid`. Each trace is plotted against the index of
+    its own `y`, traces sharing an index share its x positions.
 
+    Arrays are embedded as base64 typed arrays and only decoded by the
+    browser on the first zoom.
+
+    """
+    indexes = list()
+    xs = list()
+    xtypes = set()
+    traces = list()
+    for trace_index, y, levels in pyramids:
+        for k, index in enumerate(indexes):
+            if index is y.index or index.equals(y.index):
+                break
+        else:
+            x, xtype = pyramid_x(y.index)
+            indexes.append(y.index)
+            xs.append(serialize.typed_array(x))
+            xtypes.add(xtype)
+            k = len(indexes) - 1
+
+        traces.append({
+            'index': trace_index,
+            'x': k,
+            'y': serialize.typed_array(np.asarray(y, dtype=float)),
+            'levels': [serialize.typed_array(lv) for lv in levels],
+        })
+
+    if len(xtypes) > 1:
+        raise ValueError('pyramid requires all indexes to be numeric or '
+                         'all to be datetime')
+
+    pyr = {'xs': xs, 'xtype': xtypes.pop() if xtypes else 'linear',
+           'maxPoints': max_points, 'traces': traces}
+
+    return pyramid_js % json.dumps(pyr)
+
+
+@helpers.memory_tracked
 def create_graph(in_data, names='', colors='', title='title', xlab='xlab',
                  ylab='ylab', y2lab='y2lab', alt_trace_cols=[],
                  hovermode='compare', hoverinfo=None, annotations=[],
                  filepath='', aux_traces=[], aux_first=False, layout='',
                  alt_y=False, in_data_alt=None, colors_alt='', names_alt='',
-                 figonly=False, imagesize=None):
+                 figonly=False, imagesize=None, pyramid=False,
+                 max_points=2000, memory_budget=None, workers=None,
+                 executor='process', chunksize=None):
     """Creates a line plot 
 
     Where `in_data` is a DataFrame of lines with the index as the
@@ -131,15 +371,48 @@ def create_graph(in_data, names='', colors='', title='title', xlab='xlab',
     names_alt : similar to names, but applied to in_data_alt if
     in_data_alt passed specifically. 
 
+    pyramid : bool. If True, each trace is drawn from a min/max
+    aggregation of at most `max_points` points, so that peaks are kept.
+    When writing a `.html` file, a pyramid of finer aggregations is
+    embedded along with a script that swaps in the finest level that
+    fits the visible range whenever the graph is zoomed. The indexes of
+    `in_data` and `in_data_alt` must be sorted, and numeric or datetime,
+    each trace is zoomed along its own index. `names` should be a single
+    hovertext per trace.
+
+    max_points : the maximum number of points per trace when `pyramid`
+    is True.
+
+    memory_budget : optional, a budget in bytes for the trace arrays,
+    see `helpers.budget_factor`. Over budget, each trace is drawn from a
+    min/max aggregation of its rows, and a `names` DataFrame is sliced
+    with the same rows.
+
+    workers : optional, the number of workers used to build traces. If
+    passed, the columns are split into chunks of `chunksize` columns and
+    traces are built and validated across a pool, see
+    `helpers.map_columns`. Traces keep the order of the columns.
+
+    executor : 'process' or 'thread', the kind of pool used if
+    `workers` is passed. Processes aren't limited by the GIL, but
+    `in_data` is copied to them chunk by chunk.
+
+    chunksize : optional, the number of columns per chunk. By default
+    there are four chunks per worker.
+
     [1]:https://plot.ly/python/reference/#layout-hovermode
     """
     # setup alt traces 
+    # columns are selected by name rather than copying `in_data`
+    cols = list(in_data.columns)
     if alt_trace_cols != []:
         alt_y = True
-        in_data_alt = in_data[alt_trace_cols].copy()
-        in_data = in_data[[
-            x for x in in_data.columns if x not in in_data_alt.columns
-        ]].copy()
+        in_data_alt = in_data
+        alt_cols = list(alt_trace_cols)
+        cols = [x for x in cols if x not in alt_cols]
+
+    elif alt_y:
+        alt_cols = list(in_data_alt.columns)
 
     # setup colors
     # use default colors if none are passed
@@ -148,14 +421,14 @@ def create_graph(in_data, names='', colors='', title='title', xlab='xlab',
         # default colors creates a dictionary where the coloumns
         # of in_datda are the keys, html color codes are the 
         # values
-        colors = helpers.default_colors(in_data.columns)
+        colors = helpers.default_colors(cols)
 
     # if there are aux traces and no alt_colors, use reversed
     # default colors
     # colors are reversed in this case so that the alt traces have
     # different colors 
     if alt_y and isinstance(colors_alt, str):
-        c = in_data_alt.columns.tolist()[::-1]
+        c = alt_cols[::-1]
         colors_alt = helpers.default_colors(c, reverse=True)
 
     # setup names
@@ -165,11 +438,20 @@ def create_graph(in_data, names='', colors='', title='title', xlab='xlab',
 
     # same for alt names 
     if alt_y and isinstance(names_alt, str) and not (len(alt_trace_cols) > 0):
-        names_alt = dict(zip(in_data_alt.columns, in_data_alt.columns))
+        names_alt = dict(zip(alt_cols, alt_cols))
 
-    # if alt cols passed, duplicate names 
+    # if alt cols passed, use the same names 
     elif alt_y and len(alt_trace_cols) > 0:
-        names_alt = names.copy()
+        names_alt = names
+
+    # if there is a memory budget, downsample rows to fit it
+    factor = 1
+    if memory_budget is not None:
+        estimate = helpers.estimate_payload(in_data, cols)
+        if alt_y:
+            estimate += helpers.estimate_payload(in_data_alt, alt_cols)
+        factor = helpers.budget_factor(estimate, memory_budget,
+                                       'lineplot.create_graph')
 
     # create list of traces
     data = list()
@@ -180,29 +462,47 @@ def create_graph(in_data, names='', colors='', title='title', xlab='xlab',
     # only a single axis
     yaxis = 'y1' if alt_y else None
 
-    # create the main traces
-    for col in in_data.columns:
-        trace = create_trace(in_data, colors, col, hoverinfo, names, yaxis)
-        data.append(trace)
+    # if pyramid, traces are built from the coarsest pyramid level and
+    # the levels are kept as (trace_index, y, levels) for the script
+    pyramids = list()
 
-    # create the alt traces
+    # create the main and alt traces, in chunks across one pool if
+    # `workers`
+    args = dict(hoverinfo=hoverinfo, pyramid=pyramid, max_points=max_points,
+                factor=factor, as_dict=memory_budget is not None)
+    groups = [(in_data, cols, dict(args, colors=colors, names=names,
+                                   yaxis=yaxis))]
     if alt_y:
-        yaxis = 'y2'
-        alt_traces = []
-        for col in in_data_alt.columns:
-            trace = create_trace(in_data_alt, colors_alt, col, hoverinfo,
-                                 names_alt, yaxis)
-            alt_traces.append(trace)
-
-        data += alt_traces
+        groups.append((in_data_alt, alt_cols,
+                       dict(args, colors=colors_alt, names=names_alt,
+                            yaxis='y2')))
+
+    traces = sum(helpers.map_column_groups(create_traces, groups, workers,
+                                           executor, chunksize), [])
+
+    for i, (trace, levels) in enumerate(traces):
+        if pyramid:
+            if i < len(cols):
+                y = in_data[cols[i]]
+            else:
+                y = in_data_alt[alt_cols[i - len(cols)]]
+            pyramids.append((len(data), y, levels))
+        data.append(trace)
 
     # if more than one trace, add multiple traces 
     if len(aux_traces) > 0:
         if aux_first:
             data = aux_traces + data
+            pyramids = [(i + len(aux_traces), y, levels)
+                        for i, y, levels in pyramids]
         else:
             data = data + aux_traces
 
+    # the zoom script is only embedded in `.html` files
+    post_script = None
+    if pyramid and isinstance(filepath, str) and '.html' in filepath:
+        post_script = create_pyramid_script(pyramids, max_points)
+
     # create layout
     # if no layout is passed, use default layout from helpers
     if layout == '':
@@ -236,11 +536,12 @@ def create_graph(in_data, names='', colors='', title='title', xlab='xlab',
     # output graph 
     # setup imagesize, used only for pngs
     if not imagesize:
-        output_graph(filepath=filepath, fig=fig, figonly=figonly)
+        output_graph(filepath=filepath, fig=fig, figonly=figonly,
+                     post_script=post_script)
 
     elif imagesize:
         width, height = imagesize
         output_graph(filepath=filepath, fig=fig, figonly=figonly,
-                     width=width, height=height)
+                     width=width, height=height, post_script=post_script)
 
     return fig
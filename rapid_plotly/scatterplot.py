@@ -12,19 +12,27 @@ from . import helpers
 output_graph = helpers.output_graph
 
 
-def create_trace(x, y, col, colors, names, hoverinfo):
-    """Creates a scatter trace"""
-    trace = go.Scatter(
+def create_trace(x, y, col, colors, names, hoverinfo, as_dict=False):
+    """Creates a scatter trace
+
+    If `as_dict` is True, the trace is returned as a dict holding the
+    columns of `x` and `y` as is, see `helpers.budget_factor`.
+
+    """
+    trace = dict(
         x=x[col],
         y=y[y.columns[0]],
         mode='markers',
-        marker=go.scatter.Marker(color=colors[col]),
+        marker=dict(color=colors[col]),
         hoverinfo=hoverinfo,
         text=names[col],
         name=col
     )
 
-    return trace
+    if as_dict:
+        return dict(trace, type='scatter')
+
+    return go.Scatter(**trace)
 
 
 def create_regression(x, y):
@@ -50,10 +58,11 @@ def create_regression(x, y):
     return regline, slope, intercept, r2
 
 
+@helpers.memory_tracked
 def create_graph(x_data, y_data, names='', colors='', regline=False,
                  title='title', xlab='xlab', ylab='ylab', hoverinfo=None,
                  annotations=[], filepath='', layout='', aux_traces=[],
-                 figonly=False, imagesize=None):
+                 figonly=False, imagesize=None, memory_budget=None):
     """Creates a scatterplot
 
     `x_data` and `y_data` are expected to be dataframes or lists of 
@@ -139,21 +148,42 @@ def create_graph(x_data, y_data, names='', colors='', regline=False,
     names_alt : similar to names, but applied to in_data_alt if
     in_data_alt passed specifically. 
 
+    memory_budget : optional, a budget in bytes for the trace arrays,
+    see `helpers.budget_factor`. Over budget, only every nth point is
+    plotted, along with the matching rows of a `names` or `colors`
+    DataFrame.
+
     """
     # if x_data isn't a list, put it into a list  
     if not isinstance(x_data, list):
         x_data = [x_data]
         y_data = [y_data]
 
+    # if there is a memory budget, keep every nth row to fit it
+    if memory_budget is not None:
+        estimate = sum(helpers.estimate_payload(x) + y[y.columns[0]].nbytes
+                       * len(x.columns) for x, y in zip(x_data, y_data))
+        factor = helpers.budget_factor(estimate, memory_budget,
+                                       'scatterplot.create_graph')
+        if factor > 1:
+            x_data = [x.iloc[::factor] for x in x_data]
+            y_data = [y.iloc[::factor] for y in y_data]
+
+            # per point hovertext and colors are kept aligned
+            if isinstance(names, pd.DataFrame):
+                names = names.iloc[::factor]
+            if isinstance(colors, pd.DataFrame):
+                colors = colors.iloc[::factor]
+
     # use default colors if none are passed
     # otherwise use passed dataframe
     if isinstance(colors, str):
-        colors = x_data[0].copy()
-        colors.loc[:, :] = '#232C65'
+        colors = dict.fromkeys(x_data[0].columns, '#232C65')
 
     # setup names and if nothing is passed
+    # names are only read, so `x_data` isn't copied
     if isinstance(names, str):
-        names = x_data[0].copy()
+        names = x_data[0]
 
     # create list of traces
     data = list()
@@ -162,7 +192,8 @@ def create_graph(x_data, y_data, names='', colors='', regline=False,
         sl = x_data[i]
         for col in sl.columns:
             data.append(create_trace(x_data[i], y_data[i], col, colors,
-                                     names, hoverinfo))
+                                     names, hoverinfo,
+                                     as_dict=memory_budget is not None))
 
     # if regression, add regression trace to aux_traces
     # only works for the first scatter 
@@ -0,0 +1,254 @@
+"""Fast JSON serialization of Plotly figures
+
+`helpers.output_graph` and `helpers.to_bytes` use this module when a
+`serializer` is passed. Figures are encoded without the copy Plotly's
+`to_dict` makes of every array.
+
+Two backends are available:
+
+* 'orjson' - uses [orjson][1], which reads NumPy arrays natively and
+  writes them as JSON lists. Only available if orjson is installed.
+* 'json' - pure Python fallback using the standard library `json`
+  module. Numeric NumPy arrays are written as base64 typed arrays
+  straight from their buffers, as Plotly 6 and later do, see
+  `typed_array`. If `float_precision` is passed, they are written as
+  rounded JSON lists instead.
+
+The 'auto' backend uses 'orjson' when it is installed, otherwise 'json'.
+
+Both backends write dates as ISO strings and NaN and infinite values
+in lists as `null`, the same as Plotly, so the output can be loaded by
+plotly.js. `benchmarks/serialize.py` compares the backends.
+
+[1]: https://github.com/ijl/orjson
+"""
+import base64
+import datetime
+import json
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+backends = ['auto', 'json', 'orjson']
+
+# plotly.js typed array names of NumPy dtypes
+typed_array_dtypes = {
+    'int8': 'i1', 'uint8': 'u1', 'int16': 'i2', 'uint16': 'u2',
+    'int32': 'i4', 'uint32': 'u4', 'float32': 'f4', 'float64': 'f8',
+}
+
+# keys whose arrays aren't converted by `typed_arrays`, same as Plotly
+skipped_keys = ['geojson', 'layer', 'layers', 'range']
+
+
+def default(obj):
+    """Converts objects the `json` and `orjson` modules can't encode"""
+    if isinstance(obj, (datetime.date, datetime.datetime)):
+        return obj.isoformat()
+
+    if isinstance(obj, np.generic):
+        return obj.item()
+
+    if hasattr(obj, 'to_plotly_json'):
+        return obj.to_plotly_json()
+
+    raise TypeError('Object of type %s is not JSON serializable'
+                    % type(obj).__name__)
+
+
+def prepare_array(arr, float_precision=None, native=False, typed=False):
+    """Converts an array into something the backend can encode
+
+    If `native` is True, float and integer arrays are returned as
+    contiguous arrays, for backends that read NumPy buffers directly. If
+    `typed` is True and `float_precision` is None, they are returned as
+    base64 typed array specs, see `typed_array`.
+
+    """
+    kind = arr.dtype.kind
+
+    if typed and float_precision is None and kind in 'fiu':
+        return typed_array(arr)
+
+    if kind == 'f':
+        if float_precision is not None:
+            arr = np.round(arr, float_precision)
+        if native:
+            return np.ascontiguousarray(arr)
+
+        finite = np.isfinite(arr)
+        if finite.all():
+            return arr.tolist()
+
+        out = arr.astype(object)
+        out[~finite] = None
+        return out.tolist()
+
+    if kind in 'iub':
+        if native:
+            return np.ascontiguousarray(arr)
+        return arr.tolist()
+
+    if kind == 'M':
+        out = np.datetime_as_string(arr).astype(object)
+        out[np.isnat(arr)] = None
+        return out.tolist()
+
+    return [prepare(x, float_precision, native) for x in arr.tolist()]
+
+
+def prepare(obj, float_precision=None, native=False, typed=False):
+    """Recursively converts a figure dict for encoding, see
+    `prepare_array`
+
+    Only NumPy arrays are converted to typed arrays, and never those
+    under `skipped_keys`.
+
+    """
+    if isinstance(obj, dict):
+        return {k: prepare(v, float_precision, native,
+                           typed and k not in skipped_keys)
+                for k, v in obj.items()}
+
+    if isinstance(obj, np.ndarray):
+        return prepare_array(obj, float_precision, native, typed)
+
+    if isinstance(obj, (list, tuple)):
+        # lists of numbers or naive datetimes are converted as arrays
+        if obj and isinstance(obj[0], (int, float, np.number)):
+            arr = np.asarray(obj)
+            if arr.dtype.kind in 'fiub':
+                return prepare_array(arr, float_precision, native)
+
+        elif (obj and isinstance(obj[0], datetime.datetime)
+              and obj[0].tzinfo is None):
+            try:
+                arr = np.asarray(obj, dtype='datetime64[us]')
+            except (TypeError, ValueError):
+                pass
+            else:
+                # write whole seconds the way `isoformat` does, e.g.
+                # 2020-01-01T00:00:00
+                if (arr.astype('datetime64[s]') == arr).all():
+                    arr = arr.astype('datetime64[s]')
+                return prepare_array(arr, float_precision, native)
+
+        return [prepare(x, float_precision, native, typed) for x in obj]
+
+    if isinstance(obj, (float, np.floating)):
+        if not np.isfinite(obj):
+            return None
+        if float_precision is not None:
+            return round(float(obj), float_precision)
+
+    if isinstance(obj, np.datetime64):
+        return None if np.isnat(obj) else str(obj)
+
+    return obj
+
+
+def to_json(obj, backend='auto', float_precision=None):
+    """Encodes a figure dict, or any part of one, as a JSON string
+
+    `float_precision` is the number of decimals floats are rounded to,
+    by default floats are written at full precision.
+
+    """
+    if backend not in backends:
+        raise ValueError('backend must be one of %s, got %r'
+                         % (backends, backend))
+
+    if backend == 'auto':
+        backend = 'json' if orjson is None else 'orjson'
+
+    if backend == 'orjson':
+        if orjson is None:
+            raise ImportError('orjson is not installed, use the '
+                              "'json' backend")
+
+        obj = prepare(obj, float_precision, native=True)
+        return orjson.dumps(obj, default=default,
+                            option=orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+
+    obj = prepare(obj, float_precision, typed=True)
+    return json.dumps(obj, default=default, separators=(',', ':'))
+
+
+def figure_json(fig, backend='auto', float_precision=None):
+    """Returns JSON strings of the traces and the layout of `fig`"""
+    if isinstance(fig, dict):
+        fig_dict = fig
+    else:
+        # read the arrays as held by the figure, `to_plotly_json` copies
+        # them and, from Plotly 6, encodes them as base64
+        fig_dict = {'data': fig._data, 'layout': fig._layout}
+
+    data_json = to_json(fig_dict.get('data', []), backend, float_precision)
+    layout_json = to_json(fig_dict.get('layout', {}), backend,
+                          float_precision)
+
+    return data_json, layout_json
+
+
+def typed_array(arr, float_dtype='f8'):
+    """Encodes a numeric array as a plotly.js base64 typed array spec
+
+    Float arrays are written as `float_dtype`, 'f8' or 'f4', integer
+    arrays as 'i4' if they fit, otherwise as 'f8'. Returns None for
+    arrays that can't be typed arrays, e.g. dates.
+
+    """
+    kind = arr.dtype.kind
+
+    if kind == 'f':
+        arr = arr.astype('<' + float_dtype, copy=False)
+
+    elif kind in 'iu':
+        info = np.iinfo(np.int32)
+        if arr.size and info.min <= arr.min() and arr.max() <= info.max:
+            arr = arr.astype('<i4', copy=False)
+        else:
+            arr = arr.astype('<f8')
+
+    else:
+        return None
+
+    spec = {
+        'dtype': typed_array_dtypes[arr.dtype.name],
+        'bdata': base64.b64encode(np.ascontiguousarray(arr)).decode('ascii'),
+    }
+    if arr.ndim > 1:
+        spec['shape'] = str(arr.shape)[1:-1]
+
+    return spec
+
+
+def typed_arrays(obj, float_dtype='f8'):
+    """Returns a copy of a figure dict with numeric arrays encoded as
+    base64 typed arrays, see `typed_array`
+
+    Typed arrays are loaded by plotly.js 2.28 and later.
+
+    """
+    if isinstance(obj, dict):
+        return {k: v if k in skipped_keys else typed_arrays(v, float_dtype)
+                for k, v in obj.items()}
+
+    if isinstance(obj, (list, tuple)):
+        if obj and isinstance(obj[0], (int, float, np.number)):
+            arr = np.asarray(obj)
+            if arr.dtype.kind in 'fiu':
+                return typed_array(arr, float_dtype)
+
+        return [typed_arrays(x, float_dtype) for x in obj]
+
+    if isinstance(obj, np.ndarray):
+        spec = typed_array(obj, float_dtype)
+        if spec is None:
+            return prepare_array(obj)
+        return spec
+
+    return obj
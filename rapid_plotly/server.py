@@ -0,0 +1,381 @@
+"""Local HTTP render server
+
+Use `rapid-plotly serve` (or `server.serve`) to run a small render
+service on localhost, built on the standard library `http.server`.
+
+Graphs are rendered by POSTing a figure spec as JSON to `/render`:
+
+    ```
+    {"type": "barplot",
+     "data": {"index": ["4 Cylinders", "6 Cylinders"],
+              "columns": ["mpg"],
+              "data": [[26.6], [19.7]]},
+     "args": {"title": "MPG"},
+     "format": "html"}
+    ```
+
+`data` is a DataFrame in pandas' 'split' form and is passed as `in_data`
+to the `create_graph` function of the module named by `type`. For a
+scatterplot, `x` and `y` are passed instead of `data`. `format` is one
+of the formats of `helpers.to_bytes`, 'html' by default. Keys in `args`
+are passed to `create_graph`, except the output args in `blocked_args`,
+which are rejected, since graphs are only ever rendered into the
+response. `width`, `height` and `scale` are used for images, and
+`serializer`, 'auto' by default, and `float_precision` for 'html' and
+'json', see `helpers.output_graph`.
+
+If kaleido 1.0 or later is installed, `serve` starts a persistent image
+export engine that is reused by every request, otherwise each image is
+rendered by a fresh engine.
+
+Rendered graphs are kept in an in-memory LRU cache keyed by the spec,
+bounded by both the number of graphs and their total bytes. The
+`X-Cache` response header says whether a response was a hit. `GET
+/health` returns the cache statistics.
+
+'html' pages load plotly.js from `GET /plotly.min.js`, so the bundle
+is sent and cached by the browser once rather than embedded in every
+page.
+
+"""
+from collections import OrderedDict
+from copy import deepcopy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import hashlib
+import json
+import threading
+import pandas as pd
+import plotly.graph_objs as go
+from plotly.offline import get_plotlyjs
+from . import barplot, heatmap, helpers, lineplot, scatterplot
+
+# modules that can be named as a figure `type`
+plot_types = {
+    'barplot': barplot,
+    'heatmap': heatmap,
+    'lineplot': lineplot,
+    'scatterplot': scatterplot,
+}
+
+# content types of the formats of `helpers.to_bytes`
+content_types = {
+    'html': 'text/html; charset=utf-8',
+    'json': 'application/json',
+    'png': 'image/png',
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'webp': 'image/webp',
+    'svg': 'image/svg+xml',
+    'pdf': 'application/pdf',
+}
+
+# `create_graph` args rejected in request `args`, those that write
+# output, and those that start process pools or the process-wide
+# tracemalloc from a request thread
+blocked_args = ['filepath', 'figonly', 'imagesize', 'workers', 'executor',
+                'chunksize', 'memory_budget']
+
+# route the plotly.js bundle is served from
+plotlyjs_path = '/plotly.min.js'
+
+# plotly.js bundle, read once by `plotlyjs`
+plotlyjs_bytes = None
+
+
+class LRUCache(object):
+    """Thread-safe least recently used cache of rendered graphs
+
+    Holds at most `maxsize` items and `maxbytes` bytes, as given by the
+    `size` of each item.
+
+    """
+
+    def __init__(self, maxsize=128, maxbytes=64 * 2 ** 20):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.items = OrderedDict()
+        self.sizes = dict()
+        self.nbytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Returns the cached value of `key`, or None"""
+        with self.lock:
+            if key not in self.items:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.items.move_to_end(key)
+            return self.items[key]
+
+    def put(self, key, value, size=0):
+        """Caches `value`, evicting the least recently used items
+
+        Values larger than `maxbytes` aren't cached.
+
+        """
+        if size > self.maxbytes:
+            return
+
+        with self.lock:
+            self.nbytes -= self.sizes.pop(key, 0)
+            self.items[key] = value
+            self.items.move_to_end(key)
+            self.sizes[key] = size
+            self.nbytes += size
+
+            while (len(self.items) > self.maxsize
+                   or self.nbytes > self.maxbytes):
+                k, v = self.items.popitem(last=False)
+                self.nbytes -= self.sizes.pop(k)
+
+    def stats(self):
+        """Returns a dict of cache statistics"""
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'size': len(self.items), 'maxsize': self.maxsize,
+                    'bytes': self.nbytes, 'maxbytes': self.maxbytes}
+
+
+def spec_key(spec):
+    """Returns a cache key for a figure spec"""
+    text = json.dumps(spec, sort_keys=True, separators=(',', ':'))
+
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def read_frame(d):
+    """Creates a DataFrame from a dict in pandas' 'split' form"""
+    return pd.DataFrame(data=d['data'], index=d.get('index'),
+                        columns=d.get('columns'))
+
+
+def build_figure(spec, data, **kwargs):
+    """Creates the figure of a spec with the module named by its `type`
+
+    `data` is the DataFrame of the figure, or a tuple of the x and y
+    DataFrames for a scatterplot. The `args` of the spec and `kwargs`
+    are passed to `create_graph`, along with a fresh copy of the default
+    layout unless a layout is passed, so that figures rendered in the
+    same process don't share layout state.
+
+    """
+    module = plot_types[spec['type']]
+
+    args = dict(spec.get('args', {}), **kwargs)
+    args.setdefault('layout', deepcopy(helpers.layout))
+
+    if spec['type'] == 'scatterplot':
+        x, y = data
+        return module.create_graph(x, y, **args)
+
+    return module.create_graph(data, **args)
+
+
+def render_spec(spec):
+    """Renders a figure spec, returns `(content_type, body)`
+
+    Each graph gets a fresh copy of the default layout, since requests
+    are rendered concurrently, see `build_figure`.
+
+    """
+    fmt = spec.get('format', 'html')
+    if fmt not in content_types:
+        raise ValueError('format must be one of %s, got %r'
+                         % (sorted(content_types), fmt))
+
+    args = dict(spec.get('args', {}))
+    blocked = sorted(set(args) & set(blocked_args))
+    if blocked:
+        raise ValueError('args can not include %s' % ', '.join(blocked))
+
+    if spec.get('type') == 'scatterplot':
+        data = (read_frame(spec['x']), read_frame(spec['y']))
+    else:
+        data = read_frame(spec['data'])
+
+    fig = build_figure(spec, data, figonly=True)
+
+    body = helpers.to_bytes(fig, fmt=fmt,
+                            width=spec.get('width', 680),
+                            height=spec.get('height', 520),
+                            scale=spec.get('scale'),
+                            serializer=spec.get('serializer', 'auto'),
+                            float_precision=spec.get('float_precision'),
+                            include_plotlyjs=plotlyjs_path)
+
+    return content_types[fmt], body
+
+
+def start_engine():
+    """Starts a persistent kaleido image export engine
+
+    Returns True if the engine was started, False if kaleido isn't
+    installed or is older than 1.0, which has no persistent engine.
+
+    """
+    try:
+        import kaleido
+    except ImportError:
+        return False
+
+    if not hasattr(kaleido, 'start_sync_server'):
+        return False
+
+    kaleido.start_sync_server()
+    return True
+
+
+def stop_engine():
+    """Stops the engine started by `start_engine`, if any"""
+    try:
+        import kaleido
+    except ImportError:
+        return
+
+    if hasattr(kaleido, 'stop_sync_server'):
+        kaleido.stop_sync_server()
+
+
+def plotlyjs():
+    """Returns the plotly.js bundle as bytes, read once"""
+    global plotlyjs_bytes
+
+    if plotlyjs_bytes is None:
+        plotlyjs_bytes = get_plotlyjs().encode('utf-8')
+
+    return plotlyjs_bytes
+
+
+def warm_up():
+    """Renders a small graph in every format, so that the plotly.js
+    bundle is read and the modules used for rendering are imported before
+    the first request
+
+    Images are only kept fast between requests by a persistent engine,
+    see `start_engine`. Returns the formats that can be rendered.
+
+    """
+    fig = go.Figure(data=[go.Bar(x=['a'], y=[1])])
+
+    formats = list()
+    for fmt in ['html', 'json', 'png']:
+        try:
+            helpers.to_bytes(fig, fmt=fmt)
+            formats.append(fmt)
+        except Exception:
+            # e.g. no image export engine installed
+            pass
+
+    return formats
+
+
+class RenderHandler(BaseHTTPRequestHandler):
+    """Handles requests to the render server, see module docstring"""
+
+    # set by `make_server`
+    cache = None
+    quiet = False
+
+    def send(self, status, content_type, body, headers={}):
+        """Sends a complete response"""
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, status, obj):
+        """Sends `obj` as a JSON response"""
+        self.send(status, content_types['json'],
+                  json.dumps(obj).encode('utf-8'))
+
+    def do_GET(self):
+        if self.path == '/health':
+            self.send_json(200, {'status': 'ok',
+                                 'cache': self.cache.stats()})
+        elif self.path == plotlyjs_path:
+            self.send(200, 'application/javascript; charset=utf-8',
+                      plotlyjs(), {'Cache-Control': 'max-age=86400'})
+        else:
+            self.send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if self.path != '/render':
+            self.send_json(404, {'error': 'not found'})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            spec = json.loads(self.rfile.read(length))
+        except ValueError as e:
+            self.send_json(400, {'error': 'invalid JSON: %s' % e})
+            return
+
+        key = spec_key(spec)
+        cached = self.cache.get(key)
+        if cached is not None:
+            content_type, body = cached
+            self.send(200, content_type, body, {'X-Cache': 'hit'})
+            return
+
+        try:
+            content_type, body = render_spec(spec)
+        except (KeyError, ValueError, TypeError) as e:
+            self.send_json(400, {'error': '%s: %s'
+                                 % (type(e).__name__, e)})
+            return
+        except Exception as e:
+            self.send_json(500, {'error': '%s: %s'
+                                 % (type(e).__name__, e)})
+            return
+
+        self.cache.put(key, (content_type, body), size=len(body))
+        self.send(200, content_type, body, {'X-Cache': 'miss'})
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+
+def make_server(host='127.0.0.1', port=8050, cache_size=128, quiet=False,
+                cache_bytes=64 * 2 ** 20):
+    """Creates a render server, call `serve_forever` to run it
+
+    Pass `port=0` to use any free port, see `server.server_address`.
+
+    """
+    handler = type('Handler', (RenderHandler,), {
+        'cache': LRUCache(cache_size, cache_bytes),
+        'quiet': quiet,
+    })
+
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def serve(host='127.0.0.1', port=8050, cache_size=128, quiet=False,
+          cache_bytes=64 * 2 ** 20):
+    """Starts a persistent export engine if possible, warms up and runs
+    a render server"""
+    engine = start_engine()
+    formats = warm_up()
+    server = make_server(host, port, cache_size, quiet, cache_bytes)
+
+    host, port = server.server_address[:2]
+    print('serving on http://%s:%d, formats: %s, persistent image '
+          'engine: %s' % (host, port, ', '.join(formats),
+                          'yes' if engine else 'no'))
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if engine:
+            stop_engine()
@@ -0,0 +1,237 @@
+"""Figure sessions, for re-rendering a graph as its styling changes
+
+Use `FigureSession` when calling `create_graph` many times on the same
+data while only changing the title, labels, annotations or colors:
+
+    ```
+    from rapid_plotly import lineplot
+    from rapid_plotly.session import FigureSession
+
+    session = FigureSession(lineplot, in_data)
+    session.create_graph(title='first draft', filepath='graph.html')
+    session.create_graph(title='final', filepath='graph.html')
+    ```
+
+The traces are built and serialized once. Later calls that only change
+layout or style args patch the layout and the trace colors, and reuse
+the serialized trace arrays, so a re-render takes the same time no
+matter the size of the data.
+
+"""
+from copy import deepcopy
+import json
+from plotly.utils import PlotlyJSONEncoder
+from . import helpers
+
+# args that only change the layout, patched by `patch_layout`
+layout_args = ['title', 'xlab', 'ylab', 'y2lab', 'annotations', 'hovermode']
+
+# args that only change trace colors, patched by `patch_colors`
+style_args = ['colors', 'colors_alt']
+
+# args that only change where the graph is written
+output_args = ['filepath', 'figonly', 'imagesize']
+
+
+def unchanged(a, b):
+    """Returns True if arg values `a` and `b` are known to be equal"""
+    if a is b:
+        return True
+
+    try:
+        return bool(a == b)
+    except (ValueError, TypeError):
+        # e.g. comparing DataFrames, treat as changed
+        return False
+
+
+def split_trace(trace):
+    """Splits a trace into serialized arrays and a dict of the rest
+
+    The arrays are returned as a JSON fragment without the enclosing
+    braces, so that it can be joined with the rest of the trace by
+    `join_trace`.
+
+    """
+    d = trace.to_plotly_json()
+
+    arrays = dict()
+    for k in list(d):
+        if not isinstance(d[k], (str, dict, int, float, bool, type(None))):
+            arrays[k] = d.pop(k)
+
+    arrays_json = json.dumps(arrays, cls=PlotlyJSONEncoder)[1:-1]
+
+    return arrays_json, d
+
+
+def join_trace(arrays_json, style):
+    """Joins the output of `split_trace` into a JSON string"""
+    style_json = json.dumps(style, cls=PlotlyJSONEncoder)[1:-1]
+
+    return '{%s}' % ','.join(x for x in [arrays_json, style_json] if x)
+
+
+class FigureSession(object):
+    """Caches the serialized traces of a graph between renders
+
+    `module` is one of the graph modules, e.g. `lineplot`, and `data`
+    are the positional args of its `create_graph`, e.g. `in_data`, or
+    `x_data, y_data` for `scatterplot`. Keyword args are defaults for
+    every call to `FigureSession.create_graph`.
+
+    """
+
+    def __init__(self, module, *data, **kwargs):
+        self.module = module
+        self.data = data
+        self.kwargs = kwargs
+
+        # args the cached traces were built with
+        self.built_args = None
+        self.traces = None
+        self.layout = None
+
+    def build(self, args):
+        """Builds and serializes the traces and layout through `module`
+
+        The zoom script of a lineplot `pyramid` is not kept with the
+        cached JSON, so `pyramid` is not supported in sessions.
+
+        """
+        if args.get('pyramid'):
+            raise ValueError('pyramid is not supported by FigureSession, '
+                             'call create_graph directly')
+
+        build_args = dict(args, filepath='', figonly=True, imagesize=None)
+        if 'layout' in build_args:
+            build_args['layout'] = deepcopy(build_args['layout'])
+
+        fig = self.module.create_graph(*self.data, **build_args)
+
+        self.traces = [split_trace(t) for t in fig.data]
+        self.layout = fig.layout.to_plotly_json()
+        self.built_args = args
+
+    def needs_build(self, args):
+        """Returns True if `args` change anything but layout or style"""
+        if self.built_args is None:
+            return True
+
+        keys = set(args) | set(self.built_args)
+        for k in keys - set(layout_args + output_args):
+            a, b = args.get(k), self.built_args.get(k)
+
+            # dicts of colors are patched, anything else rebuilds
+            if k in style_args and isinstance(a, dict):
+                continue
+
+            if not unchanged(a, b):
+                return True
+
+        return False
+
+    def patch_layout(self, args):
+        """Returns a copy of the cached layout with layout args applied"""
+        layout = deepcopy(self.layout)
+
+        def set_title(d, key, text):
+            d.setdefault(key, {}).setdefault('title', {})['text'] = text
+
+        if 'title' in args:
+            layout.setdefault('title', {})['text'] = args['title']
+        if 'xlab' in args:
+            set_title(layout, 'xaxis', args['xlab'])
+        if 'ylab' in args:
+            set_title(layout, 'yaxis', args['ylab'])
+        if 'y2lab' in args and 'yaxis2' in layout:
+            set_title(layout, 'yaxis2', args['y2lab'])
+        if 'annotations' in args:
+            layout['annotations'] = args['annotations']
+
+        # same mapping as `lineplot.create_graph`
+        if 'hovermode' in args:
+            hovermode = args['hovermode']
+            layout['hovermode'] = 'x' if hovermode == 'compare' else hovermode
+
+        return layout
+
+    def patch_colors(self, style, args):
+        """Returns a copy of a trace's style with colors args applied
+
+        Plotly stores trace names as strings, so `colors` keys are
+        matched as strings, e.g. a column named 1 matches the key 1.
+
+        """
+        key = 'colors_alt' if style.get('yaxis') == 'y2' else 'colors'
+        colors = args.get(key)
+        if not isinstance(colors, dict):
+            return style
+
+        colors = {str(k): v for k, v in colors.items()}
+        if style.get('name') not in colors:
+            return style
+
+        style = deepcopy(style)
+        style.setdefault('marker', {})['color'] = colors[style['name']]
+
+        return style
+
+    def to_json(self, **kwargs):
+        """Returns the figure as JSON, rebuilding traces only if needed"""
+        args = dict(self.kwargs, **kwargs)
+
+        if self.needs_build(args):
+            self.build(args)
+
+        data_json = '[%s]' % ','.join(
+            join_trace(arrays_json, self.patch_colors(style, args))
+            for arrays_json, style in self.traces
+        )
+        layout_json = json.dumps(self.patch_layout(args),
+                                 cls=PlotlyJSONEncoder)
+
+        return data_json, layout_json
+
+    def create_graph(self, **kwargs):
+        """Renders the graph, same args as the `create_graph` of `module`
+
+        `.html` and `.json` files, file-like objects (written as
+        `.html`) and notebook output are written straight from the
+        cached JSON. Images are rendered from a dict parsed from it,
+        without validating the figure again.
+
+        Returns the figure as a JSON string.
+
+        """
+        args = dict(self.kwargs, **kwargs)
+        filepath = args.get('filepath', '')
+
+        data_json, layout_json = self.to_json(**kwargs)
+        fig_json = '{"data": %s, "layout": %s}' % (data_json, layout_json)
+
+        if not isinstance(filepath, str):
+            html = helpers.figure_html(data_json, layout_json)
+            filepath.write(html.encode('utf-8'))
+
+        elif '.html' in filepath:
+            with open(filepath, 'w') as f:
+                f.write(helpers.figure_html(data_json, layout_json))
+
+        elif '.json' in filepath:
+            with open(filepath, 'w') as f:
+                f.write(fig_json)
+
+        elif filepath == '':
+            if not args.get('figonly', False):
+                helpers.show(fig_json)
+
+        else:
+            width, height = args.get('imagesize') or (680, 520)
+            fmt = filepath.rsplit('.', 1)[-1].lower()
+            data = helpers.to_bytes(json.loads(fig_json), fmt=fmt,
+                                    width=width, height=height)
+            with open(filepath, 'wb') as f:
+                f.write(data)
+
+        return fig_json
@@ -6,4 +6,7 @@ setup(name='rapid_plotly',
       author='Joseph Dasenbrock',
       author_email='dasenbrockjw@gmail.com',
       packages=['rapid_plotly'],
+      entry_points={
+          'console_scripts': ['rapid-plotly=rapid_plotly.cli:main'],
+      },
       zip_safe=False)
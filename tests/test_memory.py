@@ -0,0 +1,97 @@
+"""Peak memory ceilings of `create_graph` calls with a `memory_budget`
+
+The tracemalloc peak recorded in `helpers.memory_reports` must stay
+under a multiple of the budget, plus the `slack` allowance for
+allocations that don't scale with the data, see `benchmarks/memory.py`.
+
+"""
+import warnings
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.memory import slack, warm_up
+from rapid_plotly import barplot, helpers, lineplot, scatterplot
+
+rows = 50000
+cols = ['c%d' % i for i in range(10)]
+
+
+@pytest.fixture(scope='module')
+def in_data():
+    rs = np.random.RandomState(0)
+    return pd.DataFrame(rs.rand(rows, len(cols)), columns=cols)
+
+
+@pytest.fixture(scope='module', autouse=True)
+def warmed_up(in_data):
+    """Warms up each function, see `benchmarks.memory.warm_up`"""
+    warm_up(in_data)
+
+
+def peak_of(func, budget):
+    """Calls `func(budget)`, returns the peak it recorded"""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', ResourceWarning)
+        func(budget)
+
+    report = helpers.memory_reports[-1]
+    assert report['budget'] == budget
+
+    return report['peak']
+
+
+def test_lineplot(in_data):
+    budget = helpers.estimate_payload(in_data)
+    peak = peak_of(lambda b: lineplot.create_graph(
+        in_data, figonly=True, memory_budget=b), budget)
+
+    assert peak <= budget * 2.5 + slack
+
+
+def test_lineplot_alt(in_data):
+    budget = helpers.estimate_payload(in_data)
+    peak = peak_of(lambda b: lineplot.create_graph(
+        in_data, alt_trace_cols=['c0', 'c1'], figonly=True,
+        memory_budget=b), budget)
+
+    assert peak <= budget * 2.5 + slack
+
+
+def test_lineplot_over_budget(in_data):
+    budget = helpers.estimate_payload(in_data) // 10
+    with pytest.warns(ResourceWarning):
+        lineplot.create_graph(in_data, figonly=True, memory_budget=budget)
+
+    assert helpers.memory_reports[-1]['peak'] <= budget * 4 + slack
+
+
+def test_barplot(in_data):
+    bars = in_data.iloc[:20000]
+    budget = helpers.estimate_payload(bars)
+    peak = peak_of(lambda b: barplot.create_graph(
+        bars, figonly=True, memory_budget=b), budget)
+
+    assert peak <= budget * 2.5 + slack
+
+
+def test_scatterplot(in_data):
+    x = in_data[['c0', 'c1']]
+    budget = helpers.estimate_payload(x) * 2
+    peak = peak_of(lambda b: scatterplot.create_graph(
+        x, in_data[['c2']], figonly=True, memory_budget=b), budget)
+
+    assert peak <= budget * 2.5 + slack
+
+
+def test_downsampled_names_aligned(in_data):
+    names = in_data.round(6).astype(str)
+    budget = helpers.estimate_payload(in_data) // 10
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', ResourceWarning)
+        fig = lineplot.create_graph(in_data, names=names, figonly=True,
+                                    memory_budget=budget)
+
+    trace = fig.data[0]
+    assert len(trace.text) == len(trace.y) < rows
+    assert list(trace.text) == [str(round(y, 6)) for y in trace.y]
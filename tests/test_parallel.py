@@ -0,0 +1,113 @@
+"""Graphs built across a pool must match graphs built serially
+
+Traces are compared in order, so a pool that returns chunks out of
+order, or mixes the main and alt axis columns, fails.
+
+"""
+from copy import deepcopy
+import numpy as np
+import pandas as pd
+import plotly.graph_objs as go
+import pytest
+from rapid_plotly import barplot, helpers, lineplot
+
+executors = helpers.executors
+
+
+def column_names(in_data, cols, suffix='', serialized=False):
+    """Returns one item per column, as `create_traces` functions do"""
+    return ['%s%s' % (col, suffix) for col in cols]
+
+
+def plain(obj):
+    """Converts arrays in a trace dict to lists, so traces compare with
+    `==` whether they hold lists or arrays"""
+    if isinstance(obj, dict):
+        return {k: plain(v) for k, v in obj.items() if k != 'uid'}
+
+    if isinstance(obj, (list, tuple, np.ndarray)):
+        return [plain(x) for x in np.asarray(obj, dtype=object).tolist()]
+
+    return obj
+
+
+def traces(fig):
+    return [plain(t.to_plotly_json()) for t in fig.data]
+
+
+@pytest.fixture(scope='module')
+def in_data():
+    rs = np.random.RandomState(0)
+    cols = ['c%d' % i for i in range(13)]
+    return pd.DataFrame(rs.randn(200, len(cols)).cumsum(0), columns=cols)
+
+
+@pytest.fixture
+def aux():
+    return [go.Scatter(x=[0, 1], y=[1, 2], name='aux')]
+
+
+@pytest.mark.parametrize('executor', executors)
+@pytest.mark.parametrize('chunksize', [None, 1, 5, 100])
+def test_map_columns_order(in_data, executor, chunksize):
+    cols = list(in_data.columns)[::-1]
+    out = helpers.map_columns(column_names, in_data, cols, workers=3,
+                              executor=executor, chunksize=chunksize,
+                              suffix='!')
+
+    assert out == column_names(in_data, cols, '!')
+
+
+def test_map_column_groups_order(in_data):
+    groups = [(in_data, ['c1', 'c0', 'c5'], dict(suffix='-main')),
+              (in_data, ['c3', 'c2'], dict(suffix='-alt'))]
+    serial = helpers.map_column_groups(column_names, groups)
+    pooled = helpers.map_column_groups(column_names, groups, workers=2,
+                                       executor='thread', chunksize=1)
+
+    assert pooled == serial == [['c1-main', 'c0-main', 'c5-main'],
+                                ['c3-alt', 'c2-alt']]
+
+
+def test_unknown_executor(in_data):
+    with pytest.raises(ValueError):
+        helpers.map_columns(column_names, in_data, in_data.columns,
+                            workers=2, executor='processes')
+
+
+@pytest.mark.parametrize('executor', executors)
+@pytest.mark.parametrize('kwargs', [
+    dict(),
+    dict(alt_trace_cols=['c3', 'c7']),
+    dict(alt_trace_cols=['c3', 'c7'], aux_first=True),
+    dict(alt_trace_cols=['c3'], memory_budget=10**9),
+], ids=['main', 'alt', 'alt-aux-first', 'alt-budget'])
+def test_lineplot_pooled_matches_serial(in_data, aux, executor, kwargs):
+    def graph(**pool_args):
+        return lineplot.create_graph(
+            in_data, figonly=True, layout=deepcopy(helpers.layout),
+            aux_traces=aux, **dict(kwargs, **pool_args))
+
+    serial = graph()
+    pooled = graph(workers=3, executor=executor, chunksize=2)
+
+    assert traces(pooled) == traces(serial)
+    assert [t.name for t in pooled.data][0 if kwargs.get('aux_first')
+                                         else -1] == 'aux'
+
+
+@pytest.mark.parametrize('executor', executors)
+@pytest.mark.parametrize('aux_first', [False, True])
+def test_barplot_pooled_matches_serial(in_data, aux, executor, aux_first):
+    bars = in_data.iloc[:20].abs()
+
+    def graph(**pool_args):
+        return barplot.create_graph(
+            bars, errors=bars * 0.1, figonly=True,
+            layout=deepcopy(helpers.layout), aux_traces=aux,
+            aux_first=aux_first, **pool_args)
+
+    serial = graph()
+    pooled = graph(workers=3, executor=executor, chunksize=2)
+
+    assert traces(pooled) == traces(serial)
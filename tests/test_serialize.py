@@ -0,0 +1,124 @@
+"""Output of `serialize.figure_json` against Plotly's own `pio.to_json`
+
+Typed arrays are decoded before comparing, so the backends can write
+arrays differently from Plotly as long as plotly.js reads the same
+values.
+
+"""
+import base64
+import json
+import numpy as np
+import pandas as pd
+import plotly.graph_objs as go
+import plotly.io as pio
+import pytest
+from rapid_plotly import lineplot, serialize
+
+backends = [
+    'json',
+    pytest.param('orjson', marks=pytest.mark.skipif(
+        serialize.orjson is None, reason='orjson is not installed')),
+]
+
+
+def decode(obj):
+    """Decodes typed arrays into lists, with NaN and infinite values as
+    None, the way plotly.js reads them"""
+    if isinstance(obj, dict):
+        if set(obj) >= {'dtype', 'bdata'}:
+            arr = np.frombuffer(base64.b64decode(obj['bdata']),
+                                dtype='<' + obj['dtype'])
+            if 'shape' in obj:
+                arr = arr.reshape([int(x) for x in obj['shape'].split(',')])
+            return decode(arr.tolist())
+
+        return {k: decode(v) for k, v in obj.items()}
+
+    if isinstance(obj, list):
+        return [decode(x) for x in obj]
+
+    if isinstance(obj, float) and not np.isfinite(obj):
+        return None
+
+    return obj
+
+
+def plotly_json(fig):
+    """Returns the decoded traces and layout written by Plotly"""
+    d = json.loads(pio.to_json(fig, engine='json'))
+    return decode(d['data']), decode(d['layout'])
+
+
+def figure_json(fig, backend, **kwargs):
+    """Returns the decoded traces and layout written by `serialize`"""
+    data_json, layout_json = serialize.figure_json(fig, backend, **kwargs)
+    return decode(json.loads(data_json)), decode(json.loads(layout_json))
+
+
+@pytest.fixture
+def fig():
+    rs = np.random.RandomState(0)
+    y = rs.rand(50)
+    y[[3, 10]] = np.nan
+    y[20] = np.inf
+
+    index = pd.date_range('2020-01-01', periods=50, freq='h')
+    return go.Figure(
+        data=[
+            go.Scatter(x=index, y=y, text=['p%d' % i for i in range(50)]),
+            go.Bar(x=np.arange(50), y=rs.randint(0, 1000, 50),
+                   marker=dict(color=rs.rand(50))),
+            go.Heatmap(z=rs.rand(4, 5)),
+        ],
+        layout=dict(title='title', xaxis=dict(range=[0, 10])),
+    )
+
+
+@pytest.mark.parametrize('backend', backends)
+def test_figure_json_matches_plotly(fig, backend):
+    assert figure_json(fig, backend) == plotly_json(fig)
+
+
+@pytest.mark.parametrize('backend', backends)
+def test_lineplot_matches_plotly(backend):
+    in_data = pd.DataFrame({'a': [1.0, np.nan, 3.0], 'b': [4, 5, 6]},
+                           index=pd.date_range('2020-01-01', periods=3))
+    fig = lineplot.create_graph(in_data, figonly=True, memory_budget=2**20)
+
+    assert figure_json(fig, backend) == plotly_json(fig)
+
+
+@pytest.mark.parametrize('backend', backends)
+def test_nan_written_as_null(backend):
+    fig = go.Figure(go.Scatter(y=[1.5, np.nan, -np.inf, 2.0]))
+
+    # lists are written when rounding, with no NaN or Infinity tokens
+    data_json, _ = serialize.figure_json(fig, backend, float_precision=3)
+    assert 'NaN' not in data_json and 'Infinity' not in data_json
+    assert json.loads(data_json)[0]['y'] == [1.5, None, None, 2.0]
+
+
+@pytest.mark.parametrize('backend', backends)
+def test_datetimes_match_plotly(backend):
+    whole = pd.date_range('2020-01-01', periods=3, freq='D')
+    fractional = pd.date_range('2020-01-01', periods=3, freq='1500ms')
+    fig = go.Figure([
+        go.Scatter(x=whole, y=[1, 2, 3]),
+        go.Scatter(x=fractional, y=[1, 2, 3]),
+        go.Scatter(x=list(whole.to_pydatetime()), y=[1, 2, 3]),
+        go.Scatter(x=whole.values.astype('datetime64[D]'), y=[1, 2, 3]),
+    ])
+
+    data, _ = figure_json(fig, backend)
+    assert data == plotly_json(fig)[0]
+    assert data[0]['x'][0] == '2020-01-01T00:00:00.000000'
+    assert data[2]['x'][0] == '2020-01-01T00:00:00'
+
+
+@pytest.mark.parametrize('backend', backends)
+def test_nat_written_as_null(backend):
+    fig = go.Figure(go.Scatter(x=pd.DatetimeIndex(['2020-01-01', None]),
+                               y=[1, 2]))
+
+    data, _ = figure_json(fig, backend)
+    assert data[0]['x'] == ['2020-01-01T00:00:00.000000', None]